@@ -43,6 +43,9 @@ python manage.py get_or_create_oauth_app \
 # Warn the user if there is no user
 python manage.py assert_app_has_users
 
+# Update the entries of FileSystemSources as soon as their files change. Restart the watcher if it stops.
+(while true; do python manage.py watch > /tmp/stdout 2>&1; sleep 10; done) &
+
 # Start Gunicorn processes
 echo Starting Gunicorn.
 exec gunicorn backend.wsgi:application \
@@ -11,6 +11,7 @@ from django.db import models, transaction
 
 from backend.settings import ARCHIVES_ROOT
 from source.models.source import BaseSource
+from source.utils.files import walk_dir, get_file_fingerprints, entry_from_file_path
 from timeline.models import Entry
 
 logger = logging.getLogger(__name__)
@@ -39,12 +40,16 @@ class BaseArchive(BaseSource):
             return 0, 0
 
         with transaction.atomic():
-            self.delete_entries()
-            entries_to_create = filter(self.is_entry_in_date_range, self.extract_entries())
-            entries_created = Entry.objects.bulk_create(entries_to_create)
+            # The rollups are updated once, after the entries are replaced
+            entries_deleted = self.delete_entries(update_rollups=False)
+            entries_created = self.create_entries(
+                filter(self.is_entry_in_date_range, self.extract_entries()), update_rollups=False
+            )
+            if entries_deleted or entries_created:
+                self.update_daily_rollups()
             self.date_processed = datetime.now(pytz.UTC)
             self.save()
-        return len(entries_created), 0
+        return entries_created, 0
 
 
 class ArchiveFile(models.Model):
@@ -108,6 +113,12 @@ class CompressedFileArchive(FileArchive):
     # frontend can serve them.
     keep_extracted_files = False
 
+    # If the archive has attachments, the metadata of all extracted files is read at once before the entries are
+    # extracted. This is much faster than reading it one file at a time.
+    has_attachments = False
+    # The extracted files that describe the archive's content. They are not attachments.
+    metadata_file_suffixes = ('.json', '.html', '.js', '.css')
+
     class Meta:
         abstract = True
 
@@ -119,6 +130,8 @@ class CompressedFileArchive(FileArchive):
         try:
             self.delete_extracted_files()
             self.extract_compressed_files()
+            if self.has_attachments:
+                self.read_attachment_metadata()
             created_entries, updated_entries = super().process(force=force)
         except KeyboardInterrupt:
             raise
@@ -126,6 +139,7 @@ class CompressedFileArchive(FileArchive):
             logger.exception(f'Failed to process compressed archive "{self.entry_source}"')
             raise
         finally:
+            self.attachment_fingerprints = {}
             if not self.keep_extracted_files:
                 self.delete_extracted_files()
         return created_entries, updated_entries
@@ -145,3 +159,20 @@ class CompressedFileArchive(FileArchive):
         logger.info(f'Deleting extracted files for "{self.entry_source}"')
         if self.extracted_files_path.exists():
             shutil.rmtree(self.extracted_files_path, ignore_errors=True)
+
+    def read_attachment_metadata(self):
+        attachments = [
+            Path(file_entry.path)
+            for current_dir, file_entries, subdirs in walk_dir(self.extracted_files_path)
+            for file_entry in file_entries
+            if Path(file_entry.name).suffix.lower() not in self.metadata_file_suffixes
+        ]
+        logger.info(f'Reading the metadata of {len(attachments)} attachments in "{self.entry_source}"')
+        self.attachment_fingerprints = dict(zip(attachments, get_file_fingerprints(attachments)))
+
+    def entry_from_file_path(self, file_path: Path) -> Entry:
+        """
+        Creates an Entry from an extracted file. The metadata of the attachments is already read.
+        """
+        fingerprint = getattr(self, 'attachment_fingerprints', {}).get(file_path)
+        return entry_from_file_path(file_path, self, fingerprint=fingerprint)
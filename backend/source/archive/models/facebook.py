@@ -8,7 +8,6 @@ from typing import Iterable, Generator
 import pytz
 
 from archive.models.base import CompressedFileArchive
-from source.utils.files import entry_from_file_path
 from timeline.models import Entry
 from timeline.utils.postprocessing import generate_previews
 
@@ -36,6 +35,7 @@ class FacebookArchive(CompressedFileArchive):
     Reads Facebook data exports
     """
     keep_extracted_files = True
+    has_attachments = True
 
     def extract_entries(self) -> Generator[Entry, None, None]:
         yield from self.extract_messages()
@@ -49,7 +49,7 @@ class FacebookArchive(CompressedFileArchive):
             logger.info(f"Processing {index + 1}/{len(album_files)} album files: {album_file.name}")
             album_json = parse_facebook_json(album_file)
             for photo in album_json['photos']:
-                entry = entry_from_file_path(self.extracted_files_path / photo['uri'], self)
+                entry = self.entry_from_file_path(self.extracted_files_path / photo['uri'])
                 entry.date_on_timeline = pytz.utc.localize(datetime.fromtimestamp(photo['creation_timestamp']))
 
                 if photo.get('description'):  # description is the caption
@@ -64,7 +64,7 @@ class FacebookArchive(CompressedFileArchive):
         logger.info(f"Processing videos")
         json_data = parse_facebook_json(self.extracted_files_path / 'photos_and_videos/your_videos.json')
         for video in json_data.get('videos', []):
-            entry = entry_from_file_path(self.extracted_files_path / video['uri'], self)
+            entry = self.entry_from_file_path(self.extracted_files_path / video['uri'])
             entry.description = video['description']
             entry.date_on_timeline = pytz.utc.localize(datetime.fromtimestamp(video['creation_timestamp']))
             yield entry
@@ -232,7 +232,7 @@ class FacebookArchive(CompressedFileArchive):
                 )
 
     def entry_from_attachment(self, file_path: Path, schema: str, date_on_timeline: datetime, extra_attributes: dict):
-        entry = entry_from_file_path(self.extracted_files_path / file_path, self)
+        entry = self.entry_from_file_path(self.extracted_files_path / file_path)
         entry.schema = schema
         entry.extra_attributes.update(extra_attributes)
         entry.date_on_timeline = date_on_timeline
@@ -10,7 +10,6 @@ import pytz
 from django.db import models
 
 from archive.models.base import CompressedFileArchive
-from source.utils.files import entry_from_file_path
 from timeline.models import Entry
 from timeline.utils.postprocessing import generate_previews
 
@@ -22,6 +21,7 @@ class TelegramArchive(CompressedFileArchive):
     Reads Telegram Desktop exports
     """
     keep_extracted_files = True  # The archive contains message attachments
+    has_attachments = True
 
     include_supergroup_chats = models.BooleanField("Include supergroup chats", default=False)
     include_group_chats = models.BooleanField("Include group chats", default=True)
@@ -107,7 +107,7 @@ class TelegramArchive(CompressedFileArchive):
 
     def entry_from_message(self, account: dict, chat: dict, message: dict) -> Entry:
         if file := self.get_message_file_path(message):
-            entry = entry_from_file_path(file, self)
+            entry = self.entry_from_file_path(file)
             mimetype = entry.extra_attributes['file']['mimetype']
             if mimetype and mimetype.startswith('audio'):
                 entry.schema = 'message.telegram.audio'
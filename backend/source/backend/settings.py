@@ -1,5 +1,6 @@
 import logging.config
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -16,6 +17,7 @@ ARCHIVES_ROOT = DATA_ROOT / 'archives'
 BACKUPS_ROOT = DATA_ROOT / 'backups'
 MOUNTS_ROOT = DATA_ROOT / 'mounts'
 PREVIEWS_ROOT = ASSETS_ROOT / 'previews'
+PREVIEWS_URL = '/assets/previews/'  # Served by nginx
 STATIC_ROOT = ASSETS_ROOT / 'static'
 ENTRIES_DUMP_PATH = DATA_ROOT / 'all-entries.json'
 
@@ -180,6 +182,22 @@ VIDEO_PREVIEW_SIZES = {
     },
 }
 
+# Still images of videos, used as posters until the video previews are loaded. Their names must not be the same as
+# the names of the VIDEO_PREVIEW_SIZES.
+VIDEO_POSTER_SIZES = {
+    'thumbnail_poster': {
+        'width': 400,
+        'height': 200,
+    },
+    'preview_poster': {
+        'width': 1280,
+        'height': 720,
+    },
+}
+
+# The x264 preset for video previews. Faster presets make larger files.
+VIDEO_PREVIEW_PRESET = 'slow'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.BasicAuthentication',
@@ -187,7 +205,7 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'timeline.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
         'timeline.renderers.GpxRenderer',
     ],
@@ -214,9 +232,31 @@ LOGIN_URL = '/api/auth/login/'
 LOGIN_REDIRECT_URL = '/'
 
 
+# Rsync sources only update the entries of the files that changed. Once in a while, all entries are recreated.
+RSYNC_RECONCILE_INTERVAL = timedelta(days=7)
+
+
+# Entries are grouped by day in this timezone. It should match the timezone of the person browsing the timeline.
+DAILY_ROLLUP_TIME_ZONE = 'Europe/Berlin'
+
+
 # In bytes
 MAX_PLAINTEXT_PREVIEW_SIZE = 10000  # 2KB = 1 page of text
 
+# Number of processes that read file metadata (checksums, EXIF data, ffprobe) when files are imported
+METADATA_EXTRACTION_WORKERS = os.cpu_count() or 1
+
+# Number of processes that generate previews, for each type of file. Videos are slow to encode, and ffmpeg already
+# uses many cores, so they have their own processes.
+PREVIEW_WORKERS = {
+    'image': os.cpu_count() or 1,
+    'video': 1,
+    'document': 1,
+}
+
+# How many times to try generating the previews of an entry before giving up
+PREVIEW_MAX_ATTEMPTS = 3
+
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
@@ -12,6 +12,8 @@ logline "Running cron-tasks.sh..."
  source /etc/timeline-cronenv;
  /usr/local/bin/python /usr/src/app/manage.py import > /tmp/stdout 2>&1;
  /usr/local/bin/python /usr/src/app/manage.py export > /tmp/stdout 2>&1;
+ /usr/local/bin/python /usr/src/app/manage.py delete_unused_previews > /tmp/stdout 2>&1;
+ /usr/local/bin/python /usr/src/app/manage.py delete_unused_fingerprints > /tmp/stdout 2>&1;
 ) 200>/etc/cronjobs.lock
 
 exit_code=$?
@@ -0,0 +1,43 @@
+import logging
+from itertools import islice
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from source.models.fingerprint import FileFingerprint
+from source.utils.files import get_fingerprint_key, fingerprint_query_size
+from timeline.models import Entry
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deletes the FileFingerprints that do not match the file of any entry. This happens when a file is ' \
+           'changed or deleted.'
+
+    def get_used_fingerprint_keys(self) -> set:
+        used_keys = set()
+        file_paths = Entry.objects\
+            .filter(extra_attributes__has_key='file')\
+            .values_list('extra_attributes__file__path', flat=True)
+        for file_path in file_paths.iterator():
+            try:
+                used_keys.add(get_fingerprint_key(Path(file_path)))
+            except OSError:
+                continue
+        return used_keys
+
+    def handle(self, *args, **options):
+        used_keys = self.get_used_fingerprint_keys()
+        unused_fingerprint_ids = iter([
+            fingerprint_id
+            for fingerprint_id, *key in FileFingerprint.objects.values_list(
+                'id', 'device', 'inode', 'size', 'mtime_ns'
+            ).iterator()
+            if tuple(key) not in used_keys
+        ])
+
+        deleted_count = 0
+        while ids_chunk := list(islice(unused_fingerprint_ids, fingerprint_query_size)):
+            deleted_count += FileFingerprint.objects.filter(id__in=ids_chunk).delete()[0]
+        logger.info(f"Deleted {deleted_count} unused file fingerprints")
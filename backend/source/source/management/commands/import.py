@@ -2,6 +2,7 @@ import logging
 
 from source.management.commands import ModelProcessingCommand
 from source.models.source import BaseSource
+from timeline.utils.partitions import create_entry_partitions
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,10 @@ class Command(ModelProcessingCommand):
     class_name = 'source/archive'
     default_class = BaseSource
 
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        create_entry_partitions()
+
     def process_instance(self, instance, force):
         created_entries, updated_entries = super().process_instance(instance, force)
         logger.log(
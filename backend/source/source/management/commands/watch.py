@@ -0,0 +1,113 @@
+import logging
+from pathlib import Path
+from typing import List
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections, OperationalError, InterfaceError
+
+from source.models import FileSystemSource
+from source.utils.files import get_include_rules_for_dir, get_files_in_dir
+from source.utils.watch import get_watcher, read_debounced_changes
+from timeline.models import PREVIEW_STATUS_PENDING
+from timeline.utils.postprocessing import generate_entry_previews, generate_previews
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Watches the directories of FileSystemSources, and updates their entries as soon as files change. ' \
+           'Restart it after adding or removing a FileSystemSource.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source_keys',
+            nargs='*',
+            type=str,
+            help='The keys of the FileSystemSources to watch. By default, all FileSystemSources are watched.',
+        )
+        parser.add_argument(
+            '--debounce',
+            type=float,
+            default=2,
+            help='Wait until files stopped changing for this many seconds before updating the entries.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10,
+            help='How often to check for changes in seconds, if inotify is not available.',
+        )
+        parser.add_argument(
+            '--polling',
+            action='store_true',
+            help='Poll for changes even if inotify is available. Use this for network mounts.',
+        )
+
+    def handle(self, *args, **options):
+        sources = FileSystemSource.objects.all()
+        if options['source_keys']:
+            sources = sources.filter(key__in=options['source_keys'])
+        sources = list(sources)
+        if not sources:
+            logger.warning("There are no FileSystemSources to watch.")
+            return
+
+        include_rules = {source.pk: self.get_include_rules(source) for source in sources}
+        watcher = get_watcher(
+            [Path(source.path) for source in sources],
+            poll_interval=options['poll_interval'],
+            use_polling=options['polling'],
+        )
+        logger.info(f"Watching {len(sources)} FileSystemSources for changes: {', '.join(map(str, sources))}")
+
+        while True:
+            changed_paths = read_debounced_changes(watcher, options['debounce'])
+
+            # The watcher can wait for hours between changes. The database connection might be closed by then.
+            close_old_connections()
+            for source in sources:
+                source_root = Path(source.path)
+                source_changed_paths = [path for path in changed_paths if source_root in path.parents]
+                if not source_changed_paths:
+                    continue
+
+                try:
+                    if any(path.name == settings.TIMELINE_INCLUDE_FILE for path in source_changed_paths):
+                        logger.info(f"{settings.TIMELINE_INCLUDE_FILE} files changed in {source}. "
+                                    f"Recreating all entries.")
+                        source.create_file_entries()
+                        include_rules[source.pk] = self.get_include_rules(source)
+                        generate_previews(source)
+                    else:
+                        self.update_source(source, source_changed_paths, include_rules[source.pk])
+                except (OperationalError, InterfaceError):
+                    # The database is unavailable. Let the watcher crash and restart.
+                    raise
+                except Exception:
+                    logger.exception(f"Failed to update the entries of {source}")
+
+    @staticmethod
+    def get_include_rules(source: FileSystemSource) -> List[Path]:
+        return list(get_include_rules_for_dir(Path(source.path), settings.TIMELINE_INCLUDE_FILE))
+
+    @staticmethod
+    def update_source(source: FileSystemSource, changed_paths: List[Path], include_rules: List[Path]):
+        created_entries, updated_entries = source.update_file_entries(changed_paths, include_rules=include_rules)
+        logger.info(f"{len(changed_paths)} files changed in {source}. "
+                    f"{created_entries} entries created, {updated_entries} updated.")
+
+        # The previews are generated after the entries are saved, so that new entries appear right away
+        changed_files = []
+        for path in changed_paths:
+            changed_files.extend(get_files_in_dir(path) if path.is_dir() else [path])
+        entries_without_previews = source.get_entries()\
+            .filter(extra_attributes__file__path__in=[str(file) for file in changed_files])\
+            .filter(preview_status=PREVIEW_STATUS_PENDING)
+        for entry in entries_without_previews:
+            try:
+                generate_entry_previews(entry)
+            except (OperationalError, InterfaceError):
+                raise
+            except Exception:
+                logger.exception(f"Could not generate previews for entry #{entry.pk}")
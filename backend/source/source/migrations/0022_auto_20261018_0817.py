@@ -0,0 +1,31 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('source', '0021_auto_20220516_1313'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device', models.BigIntegerField()),
+                ('inode', models.BigIntegerField()),
+                ('size', models.BigIntegerField()),
+                ('mtime_ns', models.BigIntegerField()),
+                ('checksum', models.CharField(max_length=128)),
+                ('mimetype', models.CharField(max_length=255, null=True)),
+                ('extra_attributes', models.JSONField(blank=True, default=dict)),
+                ('description', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='filefingerprint',
+            constraint=models.UniqueConstraint(fields=('inode', 'device', 'size', 'mtime_ns'), name='source_fingerprint_unique_file'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('source', '0022_auto_20261018_0817'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rsyncsource',
+            name='date_reconciled',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rsyncsource',
+            name='processed_backup_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
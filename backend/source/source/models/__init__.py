@@ -1,4 +1,5 @@
 from source.models.filesystem import FileSystemSource
+from source.models.fingerprint import FileFingerprint
 from source.models.git import GitSource
 from source.models.hackernews import HackerNewsSource
 from source.models.reddit import RedditSource
@@ -8,6 +9,7 @@ from source.models.trakt import TraktSource
 from source.models.twitter import TwitterSource
 
 __all__ = [
+    'FileFingerprint',
     'FileSystemSource',
     'GitSource',
     'HackerNewsSource',
@@ -2,13 +2,13 @@ import logging
 from datetime import datetime
 from functools import partial
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Iterable, List
 
 from django.db import models, transaction
 
 from backend.settings import MOUNTS_ROOT
 from source.models.source import BaseSource
-from source.utils.files import create_entries_from_directory
+from source.utils.files import create_entries_from_directory, update_entries_for_files, get_files_in_dir
 from timeline.utils.postprocessing import generate_previews
 
 logger = logging.getLogger(__name__)
@@ -22,9 +22,41 @@ class FileSystemSource(BaseSource):
 
     @transaction.atomic
     def create_file_entries(self, use_cache=True) -> int:
+        self.lock_entries()
         logger.info(f"Creating entries for {self.entry_source}")
-        return len(
-            create_entries_from_directory(Path(self.path), source=self, backup_date=datetime.now(), use_cache=use_cache)
+        return create_entries_from_directory(
+            Path(self.path), source=self, backup_date=datetime.now(), use_cache=use_cache
+        )
+
+    @transaction.atomic
+    def update_file_entries(self, changed_paths: Iterable[Path], include_rules: List[Path] = None) -> Tuple[int, int]:
+        """
+        Updates the entries of the files and directories that changed, without reprocessing the whole directory.
+        """
+        self.lock_entries()
+        updated_files = set()
+        deleted_files = set()
+        for path in changed_paths:
+            if path.is_file():
+                updated_files.add(path)
+            elif path.is_dir():
+                updated_files.update(get_files_in_dir(path))
+            else:
+                # The deleted path could be a file or a directory
+                deleted_files.add(path)
+                deleted_files.update(
+                    Path(file_path) for file_path in self.get_entries()
+                    .filter(extra_attributes__file__path__startswith=f"{str(path)}/")
+                    .values_list('extra_attributes__file__path', flat=True)
+                )
+
+        return update_entries_for_files(
+            Path(self.path),
+            source=self,
+            updated_files=updated_files,
+            deleted_files=deleted_files,
+            backup_date=datetime.now(),
+            include_rules=include_rules,
         )
 
     def get_postprocessing_tasks(self):
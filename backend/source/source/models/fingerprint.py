@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class FileFingerprint(models.Model):
+    """
+    Metadata extracted from a file. Extracting metadata is slow (checksums, EXIF data, ffprobe), so it's only done once
+    per version of a file. A version of a file is identified by its device, inode, size and modification time, so it
+    can be found without reading the file. The fingerprints are shared by all sources.
+    """
+    device = models.BigIntegerField()
+    inode = models.BigIntegerField()
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+
+    checksum = models.CharField(max_length=128)
+    mimetype = models.CharField(max_length=255, null=True)
+    extra_attributes = models.JSONField(blank=True, default=dict)
+    description = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['inode', 'device', 'size', 'mtime_ns'], name='source_fingerprint_unique_file'),
+        ]
+
+    @property
+    def key(self):
+        return self.device, self.inode, self.size, self.mtime_ns
+
+    def __str__(self):
+        return f"{self.checksum} ({self.mimetype})"
@@ -73,4 +73,5 @@ class GitSource(BaseSource):
                 }
             ))
         Entry.objects.bulk_create(entries_to_create)
+        self.update_daily_rollups()
         return len(entries_to_create), 0
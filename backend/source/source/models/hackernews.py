@@ -4,7 +4,7 @@ from typing import Tuple
 
 import pytz
 import requests
-from django.db import models, transaction
+from django.db import models
 
 from source.models.source import BaseSource
 from timeline.models import Entry
@@ -29,54 +29,45 @@ class HackerNewsSource(BaseSource):
                 return 0, 0
             logger.info(f'Retrieving {str(self)} entries after {after_date}')
 
-        updated_entries = []
-        created_entries = []
-        with transaction.atomic():
-            api_url = "https://hacker-news.firebaseio.com/v0/"
-            item_ids_for_user = requests.get(f"{api_url}user/{self.hackernews_username}.json").json()['submitted']
-            for item_id in item_ids_for_user:
-                item = requests.get(f"{api_url}item/{item_id}.json").json()
-                item_date = datetime.fromtimestamp(item['time'], pytz.UTC)
-                if not self.is_date_in_date_range(item_date):
-                    continue
-                if after_date and item_date <= after_date:
-                    break
-                if item.get('deleted'):
-                    continue
+        entries = []
+        api_url = "https://hacker-news.firebaseio.com/v0/"
+        item_ids_for_user = requests.get(f"{api_url}user/{self.hackernews_username}.json").json()['submitted']
+        for item_id in item_ids_for_user:
+            item = requests.get(f"{api_url}item/{item_id}.json").json()
+            item_date = datetime.fromtimestamp(item['time'], pytz.UTC)
+            if not self.is_date_in_date_range(item_date):
+                continue
+            if after_date and item_date <= after_date:
+                break
+            if item.get('deleted'):
+                continue
 
-                entry_values = {
-                    'title': item.get('title', ''),
-                    'description': item.get('text', ''),
-                    'date_on_timeline': item_date,
-                    'extra_attributes': {
-                        'post_id': item['id'],
-                        'post_user': self.hackernews_username,
-                        'post_score': item.get('score'),
-                    }
+            entry = Entry(
+                schema=f"{base_schema}.{item['type']}",
+                source=self.entry_source,
+                external_id=str(item['id']),
+                title=item.get('title', ''),
+                description=item.get('text', ''),
+                date_on_timeline=item_date,
+                extra_attributes={
+                    'post_id': item['id'],
+                    'post_user': self.hackernews_username,
+                    'post_score': item.get('score'),
                 }
+            )
 
-                if 'text' in item:
-                    entry_values['extra_attributes']['post_body_html'] = item['text']
-                if 'url' in item:
-                    entry_values['extra_attributes']['post_url'] = item['url']
-                if 'parent' in item:
-                    entry_values['extra_attributes']['post_parent_id'] = item['parent']
-                if 'score' in item:
-                    entry_values['extra_attributes']['post_score'] = item['score']
+            if 'text' in item:
+                entry.extra_attributes['post_body_html'] = item['text']
+            if 'url' in item:
+                entry.extra_attributes['post_url'] = item['url']
+            if 'parent' in item:
+                entry.extra_attributes['post_parent_id'] = item['parent']
+            if 'score' in item:
+                entry.extra_attributes['post_score'] = item['score']
 
-                entry, created = Entry.objects.update_or_create(
-                    schema=f"{base_schema}.{item['type']}",
-                    source=self.entry_source,
-                    extra_attributes__post_id=item['id'],
-                    defaults=entry_values
-                )
+            entries.append(entry)
 
-                if created:
-                    created_entries.append(entry)
-                else:
-                    updated_entries.append(entry)
-
-        return len(created_entries), len(updated_entries)
+        return self.upsert_entries(entries)
 
     def __str__(self):
         return f"{self.source_name}/{self.hackernews_username}"
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Tuple, List
+from typing import Tuple, List, Dict
 
 import praw as praw
 import pytz
@@ -7,6 +7,13 @@ from django.db import models, transaction
 
 from source.models.source import BaseSource
 from timeline.models import Entry
+from timeline.utils.rollups import local_date
+
+reddit_update_fields = ['title', 'description', 'date_on_timeline', 'extra_attributes']
+
+
+def has_entry_changed(existing_entry: Entry, entry: Entry) -> bool:
+    return any(getattr(existing_entry, field) != getattr(entry, field) for field in reddit_update_fields)
 
 
 class RedditSource(BaseSource):
@@ -18,8 +25,17 @@ class RedditSource(BaseSource):
     def process(self, force=False) -> Tuple[int, int]:
         created_posts, updated_posts = self.process_posts()
         created_comments, updated_comments = self.process_comments()
+        changed_entries = created_posts + updated_posts + created_comments + updated_comments
+        # Reddit dates never change, so the entries are still on the same day
+        self.update_daily_rollups({local_date(entry.date_on_timeline) for entry in changed_entries}, touch=True)
         return len(created_posts) + len(created_comments), len(updated_posts) + len(updated_comments)
 
+    def get_existing_entries(self, schema: str) -> Dict[str, Entry]:
+        return {
+            entry.extra_attributes['post_id']: entry
+            for entry in self.get_entries().filter(schema=schema).only(*reddit_update_fields)
+        }
+
     def process_posts(self) -> Tuple[List[Entry], List[Entry]]:
         reddit = praw.Reddit(
             client_id=self.client_id,
@@ -30,9 +46,7 @@ class RedditSource(BaseSource):
         updated_entries = []
         created_entries = []
 
-        submission_id_to_entry_id = dict(
-            self.get_entries().filter(schema='social.reddit.post').values_list('extra_attributes__post_id', 'id')
-        )
+        existing_entries = self.get_existing_entries('social.reddit.post')
         with transaction.atomic():
             for submission in submissions:
                 date_on_timeline = datetime.fromtimestamp(submission.created_utc, pytz.UTC)
@@ -51,15 +65,15 @@ class RedditSource(BaseSource):
                             'post_url': submission.url,
                         }
                     )
-                    entry_exists = submission.id in submission_id_to_entry_id
-                    if entry_exists:
-                        entry.id = submission_id_to_entry_id[submission.id]
-                        updated_entries.append(entry)
-                    else:
+                    existing_entry = existing_entries.get(submission.id)
+                    if existing_entry is None:
                         created_entries.append(entry)
+                    elif has_entry_changed(existing_entry, entry):
+                        entry.id = existing_entry.id
+                        updated_entries.append(entry)
 
             Entry.objects.bulk_create(created_entries)
-            Entry.objects.bulk_update(updated_entries, ['title', 'description', 'date_on_timeline', 'extra_attributes'])
+            Entry.objects.bulk_update(updated_entries, reddit_update_fields)
 
         return created_entries, updated_entries
 
@@ -73,9 +87,7 @@ class RedditSource(BaseSource):
         updated_entries = []
         created_entries = []
 
-        comment_id_to_entry_id = dict(
-            self.get_entries().filter(schema='social.reddit.comment').values_list('extra_attributes__post_id', 'id')
-        )
+        existing_entries = self.get_existing_entries('social.reddit.comment')
 
         with transaction.atomic():
             for comment in comments:
@@ -97,14 +109,14 @@ class RedditSource(BaseSource):
                            'post_user': self.reddit_username,
                         }
                     )
-                    entry_exists = comment.id in comment_id_to_entry_id
-                    if entry_exists:
-                        entry.id = comment_id_to_entry_id[comment.id]
-                        updated_entries.append(entry)
-                    else:
+                    existing_entry = existing_entries.get(comment.id)
+                    if existing_entry is None:
                         created_entries.append(entry)
+                    elif has_entry_changed(existing_entry, entry):
+                        entry.id = existing_entry.id
+                        updated_entries.append(entry)
                         
             Entry.objects.bulk_create(created_entries)
-            Entry.objects.bulk_update(updated_entries, ['title', 'description', 'date_on_timeline', 'extra_attributes'])
+            Entry.objects.bulk_update(updated_entries, reddit_update_fields)
 
         return created_entries, updated_entries
@@ -4,7 +4,7 @@ import subprocess
 from datetime import datetime
 from functools import partial
 from pathlib import Path
-from typing import Generator, Tuple, Optional
+from typing import Generator, Tuple, Optional, List
 
 import pytz
 from django.conf import settings
@@ -12,8 +12,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models, transaction
 
 from source.models.source import BaseSource
-from source.utils.datetime import datetime_to_json
-from source.utils.files import get_files_in_dir, create_entries_from_directory
+from source.utils.files import get_files_in_dir, create_entries_from_directory, update_entries_for_files, \
+    get_include_rules_for_files
 from source.utils.ssh import KEY_EXCHANGE_SSH_COPY_ID, KEY_EXCHANGE_METHODS
 from timeline.utils.postprocessing import generate_previews
 
@@ -111,19 +111,25 @@ class RsyncBackup:
             elif line[1] == 'f' and line[0] == '>':
                 if str(line).startswith('>f+++++++++'):
                     yield absolute_path, 'new'
-                elif line[3] != '.' and line[4] != '.':
+                else:
+                    # The file was transferred, so its content changed, even if only its checksum (c), its size (s)
+                    # or its modification time (t) is marked as changed
                     yield absolute_path, 'chg'
 
     def get_files(self) -> Generator[Path, None, None]:
         return get_files_in_dir(self.files_path)
 
     def get_entries(self):
-        return self.source.get_entries().filter(extra_attributes__backup_date=datetime_to_json(self.date))
+        """
+        The entries for the files in this backup. Entries normally point to the files in the /latest backup, so that
+        they don't need to be updated for every backup.
+        """
+        return self.source.get_entries().filter(extra_attributes__file__path__startswith=f"{self.files_path}/")
 
     @transaction.atomic
     def delete(self):
         """Deletes a backup's entries and files"""
-        self.get_entries().delete()
+        self.source.delete_entries(self.get_entries())
         shutil.rmtree(self.root_path, ignore_errors=True)
 
     def __eq__(self, other: 'RsyncBackup'):
@@ -136,6 +142,11 @@ class RsyncBackup:
 class RsyncSource(RsyncConnectionMixin, BaseSource):
     max_backups = models.PositiveSmallIntegerField(null=True, validators=[MinValueValidator(1)])
 
+    # The latest backup whose changes were applied to the entries
+    processed_backup_date = models.DateTimeField(null=True, blank=True)
+    # The last time all entries were recreated from the latest backup
+    date_reconciled = models.DateTimeField(null=True, blank=True)
+
     @property
     def backups_root(self) -> Path:
         return settings.BACKUPS_ROOT / self.source_name / self.key
@@ -170,11 +181,13 @@ class RsyncSource(RsyncConnectionMixin, BaseSource):
 
     def process(self, force=False) -> Tuple[int, int]:
         current_backup = self.run_rsync_backup()
-        self.purge_old_backups()
+        entry_counts = (0, 0)
         if current_backup or force:
-            return self.create_file_entries(use_cache=(not force)), 0
-        else:
-            return 0, 0
+            entry_counts = self.create_file_entries(use_cache=(not force))
+
+        # Purge after the entries are updated, because the changes in the purged backups might not be processed yet
+        self.purge_old_backups()
+        return entry_counts
 
     def run_rsync_backup(self) -> Optional[RsyncBackup]:
         """
@@ -254,28 +267,92 @@ class RsyncSource(RsyncConnectionMixin, BaseSource):
         return 0
 
     @transaction.atomic
-    def create_file_entries(self, use_cache=True) -> int:
+    def create_file_entries(self, use_cache=True) -> Tuple[int, int]:
         """
-        Delete all entries for this source, and recreate them from the latest backup. We could update the entries for
-        the files that changed only (with get_changed_files), but it's safer to just reprocess everything.
+        Update the entries to match the files in the latest backup. Only the files that changed since the last processed
+        backup are updated. All entries are recreated if use_cache is False, if some changes might be missing, or if
+        RSYNC_RECONCILE_INTERVAL has passed since the last time.
         """
+        all_backups = list(self.backups)
         try:
-            latest_backup = list(self.backups)[-1]  # self.latest_backup does not have a .date. It's called "latest".
+            latest_backup = all_backups[-1]  # self.latest_backup does not have a .date. It's called "latest".
         except IndexError:
             logger.info(f'{str(self)} has no backups to process.')
-            return 0
+            return 0, 0
+
+        latest_backup_date = pytz.UTC.localize(latest_backup.date)
+        unprocessed_backups = self.get_unprocessed_backups(all_backups)
+        needs_reconcile = (
+            not use_cache
+            or unprocessed_backups is None
+            or not self.date_reconciled
+            or datetime.now(pytz.UTC) - self.date_reconciled > settings.RSYNC_RECONCILE_INTERVAL
+        )
+
+        if needs_reconcile:
+            entry_counts = self.reconcile_file_entries(latest_backup, use_cache)
+        else:
+            entry_counts = self.update_changed_file_entries(latest_backup, unprocessed_backups)
+
+        self.processed_backup_date = latest_backup_date
+        self.save(update_fields=['processed_backup_date', 'date_reconciled'])
+        return entry_counts
 
+    def get_unprocessed_backups(self, all_backups: List[RsyncBackup]) -> Optional[List[RsyncBackup]]:
+        """
+        The backups made after the last processed backup. Returns None if the processed backup is gone, because the
+        changes between the processed backup and the remaining backups are unknown.
+        """
+        if not self.processed_backup_date:
+            return None
+        processed_backup_date = self.processed_backup_date.replace(microsecond=0, tzinfo=None)
+        if not any(backup.date == processed_backup_date for backup in all_backups):
+            return None
+        return [backup for backup in all_backups if backup.date > processed_backup_date]
+
+    def reconcile_file_entries(self, latest_backup: RsyncBackup, use_cache=True) -> Tuple[int, int]:
+        """
+        Delete all entries for this source, and recreate them from the latest backup
+        """
         if use_cache:
             logger.info(f"Creating entries for {str(latest_backup)}")
         else:
             logger.info(f"Creating entries for {str(latest_backup)} - ignoring cache")
 
-        return len(create_entries_from_directory(
-            latest_backup.files_path,
+        entries_created = create_entries_from_directory(
+            self.latest_backup.files_path,
             source=self,
             backup_date=latest_backup.date,
             use_cache=use_cache
-        ))
+        )
+        self.date_reconciled = datetime.now(pytz.UTC)
+        return entries_created, 0
+
+    def update_changed_file_entries(self, latest_backup: RsyncBackup, backups: List[RsyncBackup]) -> Tuple[int, int]:
+        """
+        Update the entries of the files that were added, changed or deleted by the given backups
+        """
+        changes = {}
+        for backup in backups:
+            for file_path, change_type in backup.get_changed_files():
+                changes[file_path.relative_to(backup.files_path)] = change_type
+
+        if any(relative_path.name == settings.TIMELINE_INCLUDE_FILE for relative_path in changes.keys()):
+            # The include rules changed, so any file could be included or excluded
+            logger.info(f"{settings.TIMELINE_INCLUDE_FILE} files changed in {str(self)}. Recreating all entries.")
+            return self.reconcile_file_entries(latest_backup)
+
+        logger.info(f"Updating entries for {len(changes)} changed files in {str(latest_backup)}")
+        files_path = self.latest_backup.files_path
+        updated_files = [files_path / path for path, change_type in changes.items() if change_type != 'del']
+        return update_entries_for_files(
+            files_path,
+            source=self,
+            updated_files=updated_files,
+            deleted_files=[files_path / path for path, change_type in changes.items() if change_type == 'del'],
+            backup_date=latest_backup.date,
+            include_rules=get_include_rules_for_files(files_path, updated_files, settings.TIMELINE_INCLUDE_FILE),
+        )
 
     def get_postprocessing_tasks(self):
         return super().get_postprocessing_tasks() + [
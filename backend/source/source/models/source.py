@@ -1,13 +1,16 @@
 import logging
 from datetime import datetime, date
+from itertools import islice
 from typing import Tuple, Iterable
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, connection, transaction
 from django.db.models import QuerySet
 from django.db.models.signals import post_delete
+from psycopg2.extras import execute_values
 
 from timeline.models import Entry
+from timeline.utils.rollups import update_daily_rollups, get_entry_dates, local_date
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +35,7 @@ class BaseSource(models.Model):
         instance.post_delete()
 
     def post_delete(self):
-        self.get_entries().delete()
+        self.delete_entries()
 
     class Meta:
         abstract = True
@@ -56,11 +59,150 @@ class BaseSource(models.Model):
     def get_entries(self) -> QuerySet:
         return Entry.objects.filter(source=self.entry_source)
 
-    def delete_entries(self):
-        deleted_count = self.get_entries().delete()[0]
-        logger.info(f'Deleted {deleted_count} existing entries for source "{str(self)}"')
+    def delete_entries(self, entries: QuerySet = None, update_rollups=True) -> int:
+        """
+        Deletes all entries of this source, or only the given entries. The daily rollups of the days that had entries
+        are updated, unless update_rollups is False. Returns the number of deleted entries.
+        """
+        if entries is None:
+            entries = self.get_entries()
+            # No entries are left, so recalculating all the rollups of this source is cheap
+            deleted_dates = None
+        else:
+            deleted_dates = get_entry_dates(entries)
+            if not deleted_dates:
+                return 0
+
+        deleted_count = entries.delete()[0]
+        if deleted_count:
+            if update_rollups:
+                self.update_daily_rollups(deleted_dates)
+            logger.info(f'Deleted {deleted_count} existing entries for source "{str(self)}"')
         return deleted_count
 
+    def lock_entries(self):
+        """
+        Waits until other processes are done changing the entries of this source, and keeps them from changing the
+        entries until the current transaction ends.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [self.entry_source])
+
+    def update_daily_rollups(self, dates: Iterable[date] = None, touch=False):
+        """
+        Entries are often created and deleted in bulk, without triggering signals. The daily rollups must be updated
+        afterwards.
+        """
+        update_daily_rollups(self.entry_source, dates, touch=touch)
+
+    def upsert_entries(
+        self,
+        entries: Iterable[Entry],
+        update_fields: Iterable[str] = ('title', 'description', 'extra_attributes'),
+        batch_size: int = 1000
+    ) -> Tuple[int, int]:
+        """
+        Creates the entries, or updates the entries with the same (source, schema, external_id, date_on_timeline). The
+        entries table is partitioned by date, so the date must be part of the unique key. If the date of an entry
+        changed, the entry with the old date is replaced. The entries are written in batches, with one
+        INSERT ... ON CONFLICT DO UPDATE query per batch. Entries that did not change are not written. Returns the
+        number of created and updated entries.
+        """
+        insert_fields = [Entry._meta.get_field(name) for name in (
+            'date_on_timeline', 'source', 'schema', 'title', 'description', 'extra_attributes', 'external_id',
+            'preview_status', 'preview_attempts'
+        )]
+        key_fields = [Entry._meta.get_field(name) for name in ('source', 'schema', 'external_id', 'date_on_timeline')]
+        key_columns = ', '.join(field.column for field in key_fields)
+        insert_template = '(' + ', '.join(
+            '%s::jsonb' if field.name == 'extra_attributes' else '%s' for field in insert_fields
+        ) + ')'
+        insert_query = f"""
+            INSERT INTO {Entry._meta.db_table} ({', '.join(field.column for field in insert_fields)})
+            VALUES %s
+            ON CONFLICT ({key_columns}) WHERE external_id IS NOT NULL
+            DO UPDATE SET {', '.join(f'{field} = EXCLUDED.{field}' for field in update_fields)}
+            WHERE ({', '.join(f'{Entry._meta.db_table}.{field}' for field in update_fields)})
+                IS DISTINCT FROM ({', '.join(f'EXCLUDED.{field}' for field in update_fields)})
+            RETURNING date_on_timeline
+        """
+        # RETURNING (xmax = 0) would tell inserts from updates, but it does not work on partitioned tables
+        existing_entries_query = f"""
+            SELECT COUNT(*) FROM {Entry._meta.db_table}
+            JOIN (VALUES %s) AS batch ({key_columns}) USING ({key_columns})
+        """
+        # The date can't be updated, because it's part of the unique key
+        moved_entries_query = f"""
+            DELETE FROM {Entry._meta.db_table} AS entry
+            USING (VALUES %s) AS batch ({key_columns})
+            WHERE entry.source = batch.source
+                AND entry.schema = batch.schema
+                AND entry.external_id = batch.external_id
+                AND entry.date_on_timeline <> batch.date_on_timeline
+            RETURNING entry.date_on_timeline
+        """
+
+        created_count = 0
+        updated_count = 0
+        changed_dates = set()
+        entries = iter(entries)
+        with transaction.atomic():
+            while batch := list(islice(entries, batch_size)):
+                # A row can't be updated twice by the same query. If an entry appears twice, keep the latest version.
+                entries_by_key = {
+                    (entry.source, entry.schema, entry.external_id or id(entry)): entry
+                    for entry in batch
+                }
+                rows = [
+                    [field.get_db_prep_save(getattr(entry, field.attname), connection) for field in insert_fields]
+                    for entry in entries_by_key.values()
+                ]
+                keys = [
+                    [field.get_db_prep_save(getattr(entry, field.attname), connection) for field in key_fields]
+                    for entry in entries_by_key.values()
+                ]
+                with connection.cursor() as cursor:
+                    existing_count = execute_values(
+                        cursor.cursor, existing_entries_query, keys, template='(%s, %s, %s, %s::timestamptz)',
+                        page_size=len(keys), fetch=True
+                    )[0][0]
+                    moved_dates = execute_values(
+                        cursor.cursor, moved_entries_query, keys, template='(%s, %s, %s, %s::timestamptz)',
+                        page_size=len(keys), fetch=True
+                    )
+                    # The unchanged entries are not returned
+                    written_dates = execute_values(
+                        cursor.cursor, insert_query, rows, template=insert_template, page_size=len(rows), fetch=True
+                    )
+                batch_created_count = len(rows) - existing_count - len(moved_dates)
+                created_count += batch_created_count
+                updated_count += len(written_dates) - batch_created_count
+                changed_dates.update(
+                    local_date(date_on_timeline) for (date_on_timeline,) in moved_dates + written_dates
+                )
+
+        # The rollups are touched, because the content of their entries changed even if their counts did not
+        self.update_daily_rollups(changed_dates, touch=True)
+        return created_count, updated_count
+
+    def create_entries(self, entries: Iterable[Entry], batch_size: int = 1000, update_rollups=True) -> int:
+        """
+        Creates the entries in batches. The entries are consumed batch by batch, so memory usage depends on the batch
+        size, not on the number of entries. All batches are created in the same transaction. The daily rollups are
+        updated afterwards, unless update_rollups is False. Returns the number of created entries.
+        """
+        created_count = 0
+        entries = iter(entries)
+        with transaction.atomic():
+            while batch := list(islice(entries, batch_size)):
+                Entry.objects.bulk_create(batch)
+                created_count += len(batch)
+                logger.info(f'Created {created_count} entries for source "{str(self)}"')
+
+        if created_count and update_rollups:
+            self.update_daily_rollups()
+        return created_count
+
     def get_preprocessing_tasks(self) -> Iterable:
         return []
 
@@ -88,6 +230,7 @@ class BaseSource(models.Model):
             total_deleted += self.get_entries().filter(date_on_timeline__gt=self.date_until).delete()[0]
 
         if total_deleted > 0:
+            self.update_daily_rollups()
             range_message = f'Deleted {total_deleted} {str(self)} entries outside of date range '
             if self.date_from and self.date_until:
                 range_message += f'({self.date_from.strftime("%Y-%m-%d %H:%M")} ' \
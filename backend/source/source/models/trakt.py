@@ -1,9 +1,9 @@
 import logging
-from typing import Tuple, List
+from typing import Tuple
 import datetime
 
 from trakt import Trakt
-from django.db import models, transaction
+from django.db import models
 from django.forms.models import model_to_dict
 
 from source.models.oauth import OAuthSource
@@ -163,68 +163,54 @@ class TraktSource(OAuthSource):
         self.app_init()
         (movies, shows) = self.app()
 
-        updated_shows = []
-        created_shows = []
-        updated_movies = []
-        created_movies = []
-        with transaction.atomic():
-            for movie in movies:
-                entry_values = {
-                    'title': movie.title,
-                    'date_on_timeline': movie.watched_at,
-                    'extra_attributes': {
-                        'year': movie.year,
-                        'trakt_id': [k[1] for k in movie.keys if k[0] == 'trakt'][0],
-                        'trakt_event_id': movie.id,
-                        'url': trakt_site + 'movies/' + [k[1] for k in movie.keys if k[0] == 'slug'][0]
-                    }
+        entries = []
+        for movie in movies:
+            entry_values = {
+                'title': movie.title,
+                'date_on_timeline': movie.watched_at,
+                'extra_attributes': {
+                    'year': movie.year,
+                    'trakt_id': [k[1] for k in movie.keys if k[0] == 'trakt'][0],
+                    'trakt_event_id': movie.id,
+                    'url': trakt_site + 'movies/' + [k[1] for k in movie.keys if k[0] == 'slug'][0]
                 }
-
-                entry, created = Entry.objects.update_or_create(
-                    schema='activity.watching.movie',
-                    source=self.entry_source,
-                    extra_attributes__trakt_event_id=movie.id,
-                    defaults=entry_values
-                )
-
-                if created:
-                    created_movies.append(entry)
-                else:
-                    updated_movies.append(entry)
-
-            for show in shows:
-                entry_values = {
-                    'title': show.show.title + ' - ' + show.title + '- S' + str(show.pk[0]) + 'E' + str(show.pk[1]),
-                    'date_on_timeline': show.watched_at,
-                    'extra_attributes': {
-                        # specific episode info
-                        'episode': {
-                            'name': show.title,
-                            'season': show.pk[0],
-                            'number': show.pk[1],
-                            'trakt_id': [k[1] for k in show.keys if k[0] == 'trakt'][0],
-                        },
-                        # overall show info
-                        'show': {
-                            'name': show.show.title,
-                            'year': show.show.year,
-                            'trakt_id': [k[1] for k in show.show.keys if k[0] == 'trakt'][0],
-                        },
-                        'trakt_event_id': show.id,
-                        'url': f'{trakt_site}shows/{[k[1] for k in show.show.keys if k[0] == "slug"][0]}/seasons/{show.pk[0]}/episodes/{show.pk[1]}' 
-                    }
+            }
+
+            entries.append(Entry(
+                schema='activity.watching.movie',
+                source=self.entry_source,
+                external_id=str(movie.id),
+                **entry_values
+            ))
+
+        for show in shows:
+            entry_values = {
+                'title': show.show.title + ' - ' + show.title + '- S' + str(show.pk[0]) + 'E' + str(show.pk[1]),
+                'date_on_timeline': show.watched_at,
+                'extra_attributes': {
+                    # specific episode info
+                    'episode': {
+                        'name': show.title,
+                        'season': show.pk[0],
+                        'number': show.pk[1],
+                        'trakt_id': [k[1] for k in show.keys if k[0] == 'trakt'][0],
+                    },
+                    # overall show info
+                    'show': {
+                        'name': show.show.title,
+                        'year': show.show.year,
+                        'trakt_id': [k[1] for k in show.show.keys if k[0] == 'trakt'][0],
+                    },
+                    'trakt_event_id': show.id,
+                    'url': f'{trakt_site}shows/{[k[1] for k in show.show.keys if k[0] == "slug"][0]}/seasons/{show.pk[0]}/episodes/{show.pk[1]}' 
                 }
+            }
 
-                entry, created = Entry.objects.update_or_create(
-                    schema='activity.watching.show',
-                    source=self.entry_source,
-                    extra_attributes__trakt_event_id=show.id,
-                    defaults=entry_values
-                )
-
-                if created:
-                    created_shows.append(entry)
-                else:
-                    updated_shows.append(entry)
+            entries.append(Entry(
+                schema='activity.watching.show',
+                source=self.entry_source,
+                external_id=str(show.id),
+                **entry_values
+            ))
 
-        return len(created_shows + created_movies), len(updated_shows + updated_movies)
+        return self.upsert_entries(entries, update_fields=('title', 'extra_attributes'))
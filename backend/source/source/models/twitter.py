@@ -3,7 +3,7 @@ from typing import Tuple
 
 import pytz
 import tweepy as tweepy
-from django.db import models, transaction
+from django.db import models
 
 from source.models.source import BaseSource
 from timeline.models import Entry
@@ -47,33 +47,24 @@ class TwitterSource(BaseSource):
             since_id=latest_entry_id,
         ).items()
 
-        updated_entries = []
-        created_entries = []
-        with transaction.atomic():
-            for tweet in cursor:
-                defaults = {
-                    'title': '',
-                    'description': tweet.full_text,
-                    'date_on_timeline': pytz.utc.localize(tweet.created_at),
-                    'extra_attributes': {
-                        'post_id': tweet.id,
-                        'post_user': self.twitter_username,
-                    }
+        entries = []
+        for tweet in cursor:
+            entry = Entry(
+                schema=schema,
+                source=self.entry_source,
+                external_id=str(tweet.id),
+                title='',
+                description=tweet.full_text,
+                date_on_timeline=pytz.utc.localize(tweet.created_at),
+                extra_attributes={
+                    'post_id': tweet.id,
+                    'post_user': self.twitter_username,
                 }
+            )
 
-                if tweet.in_reply_to_status_id:
-                    defaults['extra_attributes']['post_parent_id'] = tweet.in_reply_to_status_id
+            if tweet.in_reply_to_status_id:
+                entry.extra_attributes['post_parent_id'] = tweet.in_reply_to_status_id
 
-                entry, created = Entry.objects.update_or_create(
-                    schema=schema,
-                    source=self.entry_source,
-                    extra_attributes__post_id=tweet.id,
-                    defaults=defaults,
-                )
+            entries.append(entry)
 
-                if created:
-                    created_entries.append(entry)
-                else:
-                    updated_entries.append(entry)
-
-        return len(created_entries), len(updated_entries)
+        return self.upsert_entries(entries)
@@ -20,6 +20,7 @@ class RsyncSourceSerializer(BaseSourceSerializer):
     class Meta:
         model = RsyncSource
         fields = '__all__'
+        read_only_fields = ['processed_backup_date', 'date_reconciled']
 
 
 class TwitterSourceSerializer(BaseSourceSerializer):
@@ -1,27 +1,41 @@
+import fnmatch
 import hashlib
 import json
 import logging
 import mimetypes
+import multiprocessing
+import os
 import re
 import subprocess
 # from collections import Generator
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
 from datetime import datetime
-from fnmatch import fnmatch
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List, Optional, Generator
+from typing import Iterable, List, Optional, Generator, Pattern, Tuple
 
+import django
 import pytz
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
+from django.db.models import QuerySet
 
 from backend import settings
+from source.models.fingerprint import FileFingerprint
 from source.models.source import BaseSource
 from source.utils.datetime import parse_exif_date, datetime_to_json, json_to_datetime
 from source.utils.geo import dms_to_decimal
-from timeline.models import Entry
+from timeline.models import Entry, PREVIEW_STATUS_PENDING
+from timeline.utils.rollups import local_date
 
 logger = logging.getLogger(__name__)
 
+fingerprint_query_size = 5000
+metadata_extraction_chunk_size = 20
+probe_cache_size = 256
+
 
 class FileFormatError(Exception):
     """
@@ -66,44 +80,163 @@ def get_filename_date(file_path: Path) -> Optional[datetime]:
 
 
 def get_files_in_dir(dir_path: Path) -> Generator[Path, None, None]:
-    for path in dir_path.rglob('*'):
-        if path.is_file():
-            yield path
+    for current_dir, file_entries, subdirs in walk_dir(dir_path):
+        for file_entry in file_entries:
+            yield Path(file_entry.path)
+
+
+def walk_dir(dir_path: Path) -> Generator[Tuple[str, List[os.DirEntry], List[str]], None, None]:
+    """
+    Walks a directory tree with os.scandir, which is much faster than Path.rglob() and Path.is_file() on large trees.
+    Yields the path, the files and the subdirectories of each directory. Symlinked directories are not followed, just
+    like with Path.rglob(). Subdirectories removed from the list are not walked.
+    """
+    dirs_to_walk = [str(dir_path)]
+    while dirs_to_walk:
+        current_dir = dirs_to_walk.pop()
+        file_entries = []
+        subdirs = []
+        try:
+            with os.scandir(current_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        subdirs.append(dir_entry.path)
+                    elif dir_entry.is_file():
+                        file_entries.append(dir_entry)
+        except OSError:
+            logger.exception(f"Could not read directory {current_dir}")
+            continue
+
+        yield current_dir, file_entries, subdirs
+        dirs_to_walk.extend(reversed(subdirs))
+
+
+def read_include_file(include_file_path: Path) -> List[Path]:
+    with open(include_file_path, 'r') as include_file:
+        return [include_file_path.parent / line.strip() for line in include_file.readlines() if line.strip()]
 
 
 def get_include_rules_for_dir(dir_path: Path, includefile_name: str) -> Generator[Path, None, None]:
-    timelineinclude_paths = dir_path.rglob(includefile_name)
-    for timelineinclude_path in timelineinclude_paths:
-        with open(timelineinclude_path, 'r') as timelineinclude_file:
-            for line in timelineinclude_file.readlines():
-                glob_path = timelineinclude_path.parent / Path(line.strip())
-                relative_glob_path = glob_path.relative_to(dir_path)
-                yield dir_path / relative_glob_path
+    for current_dir, file_entries, subdirs in walk_dir(dir_path):
+        for file_entry in file_entries:
+            if file_entry.name == includefile_name:
+                yield from read_include_file(Path(file_entry.path))
 
 
-def get_files_matching_rules(files: Iterable[Path], rules: Iterable[Path]) -> Generator[Path, None, None]:
+def get_include_rules_for_files(dir_path: Path, files: Iterable[Path], includefile_name: str) -> List[Path]:
+    """
+    Returns the include rules that apply to some files in a directory. Include rules only apply to their own directory,
+    so only the include files in the parent directories of these files are read, instead of walking the whole directory.
+    """
+    parent_dirs = set()
     for file in files:
-        # Path.match() doesn't match ** to multiple subdirs, so we use fnmatch
-        if any(fnmatch(str(file), str(rule)) for rule in rules):
-            yield file
+        parent_dirs.update(parent for parent in file.parents if parent == dir_path or dir_path in parent.parents)
+
+    rules = []
+    for parent_dir in sorted(parent_dirs):
+        include_file_path = parent_dir / includefile_name
+        if include_file_path.is_file():
+            rules.extend(read_include_file(include_file_path))
+    return rules
+
+
+def compile_include_rules(rules: Iterable[Path]) -> Optional[Pattern]:
+    """
+    Combines include rules into a single regex. Path.match() doesn't match ** to multiple subdirs, so the rules follow
+    fnmatch syntax.
+    """
+    rule_patterns = [f'(?:{fnmatch.translate(str(rule))})' for rule in rules]
+    return re.compile('|'.join(rule_patterns)) if rule_patterns else None
+
+
+def get_rule_prefix(rule: Path) -> str:
+    """
+    The part of a rule before the first wildcard. Only paths that start with this prefix can match the rule.
+    """
+    return re.split(r'[*?\[]', str(rule), maxsplit=1)[0]
+
+
+def get_files_matching_rules(files: Iterable[Path], rules: Iterable[Path]) -> Generator[Path, None, None]:
+    if rules_regex := compile_include_rules(rules):
+        for file in files:
+            if rules_regex.match(str(file)):
+                yield file
+
+
+def get_included_files_in_dir(dir_path: Path, includefile_name: str) -> List[Path]:
+    """
+    Returns the files included by the include files in a directory, in a single pass over the directory tree. Include
+    files are read as they are found, and their rules only apply to their own directory. Files are only matched against
+    the rules in directories that a rule can match.
+
+    Directories that no rule can match are still walked, because they can contain other include files.
+    """
+    included_files = []
+    inherited_rules = {}  # The rules of the parent directories, for each directory that is not walked yet
+
+    for current_dir, file_entries, subdirs in walk_dir(dir_path):
+        rules, rules_regex = inherited_rules.pop(current_dir, ([], None))
+
+        if include_file := next((entry for entry in file_entries if entry.name == includefile_name), None):
+            rules = rules + read_include_file(Path(include_file.path))
+            rules_regex = compile_include_rules(rules)
+
+        current_dir_prefix = current_dir + os.sep
+        if rules_regex and any(
+            prefix.startswith(current_dir_prefix) or current_dir_prefix.startswith(prefix)
+            for prefix in map(get_rule_prefix, rules)
+        ):
+            included_files.extend(
+                Path(file_entry.path) for file_entry in file_entries if rules_regex.match(file_entry.path)
+            )
+
+        for subdir in subdirs:
+            inherited_rules[subdir] = (rules, rules_regex)
+
+    return included_files
+
+
+def probe_media(file_path: Path) -> dict:
+    """
+    Reads the format and streams of an audio or video file with ffprobe. The mimetype and the media attributes are
+    read from the same output, so the result is cached per fingerprint to only run ffprobe once per file.
+    """
+    return _probe_media(str(file_path), get_fingerprint_key(file_path))
+
+
+@lru_cache(maxsize=probe_cache_size)
+def _probe_media(file_path: str, fingerprint_key: Tuple[int, int, int, int]) -> dict:
+    ffprobe_cmd = subprocess.run(
+        [
+            'ffprobe',
+            '-v', 'error',
+            '-show_format', '-show_streams',
+            '-of', 'json',
+            file_path
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        return json.loads(ffprobe_cmd.stdout.decode('utf-8'))
+    except ValueError:
+        return {}
+
+
+def get_media_streams(file_path: Path, codec_type: str) -> List[dict]:
+    return [stream for stream in probe_media(file_path).get('streams', []) if stream.get('codec_type') == codec_type]
+
+
+def get_media_duration(file_path: Path, stream: dict) -> Optional[int]:
+    # Some containers (webm, mkv) only have a duration in the format, not in the streams
+    duration = stream.get('duration') or probe_media(file_path).get('format', {}).get('duration')
+    return int(float(duration)) if duration else None
 
 
 def get_mimetype(file_path: Path) -> str:
     if file_path.suffix == '.mp4':
         # Some .mp4 files are actually audio files. Notably, Facebook archives use .mp4 for audio messages.
-        ffprobe_cmd = subprocess.run(
-            [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'stream=codec_type',
-                '-of', 'json',
-                str(file_path)
-            ],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        all_streams = json.loads(ffprobe_cmd.stdout.decode('utf-8')).get('streams', [])
-        has_audio_streams = bool([s for s in all_streams if s['codec_type'] == 'audio'])
-        has_video_streams = bool([s for s in all_streams if s['codec_type'] == 'video'])
+        has_audio_streams = bool(get_media_streams(file_path, 'audio'))
+        has_video_streams = bool(get_media_streams(file_path, 'video'))
         return 'audio/mp4' if has_audio_streams and not has_video_streams else 'video/mp4'
     return mimetypes.guess_type(file_path, strict=False)[0]
 
@@ -128,123 +261,264 @@ def get_schema_from_mimetype(mimetype) -> str:
     return schema
 
 
-def create_entries_from_directory(path: Path, source: BaseSource, backup_date: datetime, use_cache=True) -> List[Entry]:
+def get_fingerprint_key(file_path: Path) -> Tuple[int, int, int, int]:
+    file_stat = file_path.stat()
+    return file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+def get_file_metadata(file_path: Path) -> dict:
     """
-    Delete and recreate the Entries for the files in a directory.
+    Reads the checksum, mimetype and metadata of a file. This is slow, so the results are saved as FileFingerprints.
     """
-    timelineinclude_rules = list(get_include_rules_for_dir(path, settings.TIMELINE_INCLUDE_FILE))
-    files = list(get_files_matching_rules(get_files_in_dir(path), timelineinclude_rules))
+    mimetype = get_mimetype(file_path)
+    metadata = {
+        'checksum': get_checksum(file_path),
+        'mimetype': mimetype,
+        'extra_attributes': {},
+        'description': '',
+    }
 
-    inode_checksum_cache = {}  # translates file inodes to checksums
-    metadata_cache = {}  # translates checksums to entry metadata
-    cached_extra_attributes = ('location', 'media', 'previews')
-    if use_cache:
-        # Most files in a directory already have a matching Entry. Recalculating the metadata for each file Entry is
-        # wasteful and time-consuming.
-        # Instead, we build a cache of all files that have an Entry. If we process a file that already has an Entry (if
-        # they have the same inode), we can reuse the cached Entry metadata.
-        for entry in source.get_entries():
+    if mimetype:
+        if mimetype.startswith('image/'):
+            metadata['extra_attributes'].update(get_image_extra_attributes(file_path))
+        if mimetype.startswith('video/'):
             try:
-                # We also avoid calculating checksums if we don't have to. Instead, we compare the file inodes. If the
-                # inodes are the same, THEN we calculate and compare the checksums. If the file in the Entry and the
-                # file in the directory have the same checksum, then they're identical, and we can reuse the metadata.
-                entry_file_inode = Path(entry.extra_attributes['file']['path']).stat().st_ino
-                inode_checksum_cache[entry_file_inode] = entry.extra_attributes['file']['checksum']
-            except FileNotFoundError:
-                # This can happen if the file in the Entry was deleted or moved.
-                pass
+                metadata['extra_attributes'].update(get_video_extra_attributes(file_path))
+            except FileFormatError:
+                logger.exception(f"Could not read metadata for video {str(file_path)}")
+        if mimetype.startswith('audio/'):
+            metadata['extra_attributes'].update(get_audio_extra_attributes(file_path))
+        if mimetype.startswith('text/'):
+            with file_path.open('r') as text_file:
+                metadata['description'] = text_file.read(settings.MAX_PLAINTEXT_PREVIEW_SIZE)
 
-            metadata = {}
+    return metadata
 
-            for attribute in cached_extra_attributes:
-                if attribute in entry.extra_attributes:
-                    metadata[attribute] = entry.extra_attributes[attribute]
 
-            if entry.description:
-                metadata['description'] = entry.description
+def get_files_metadata(files: List[Path]) -> List[dict]:
+    """
+    Reads the metadata of many files in parallel, with METADATA_EXTRACTION_WORKERS processes. The results are in the
+    same order as the files.
+    """
+    worker_count = min(settings.METADATA_EXTRACTION_WORKERS, len(files))
+    if worker_count <= 1:
+        return [get_file_metadata(file) for file in files]
 
-            metadata_cache[entry.extra_attributes['file']['checksum']] = metadata
+    logger.info(f"Reading the metadata of {len(files)} files with {worker_count} processes")
+    # The workers are started by a fork server, so they don't share the database connection of this process. They set
+    # up Django, because this module imports the models.
+    with ProcessPoolExecutor(
+        max_workers=worker_count, mp_context=multiprocessing.get_context('forkserver'), initializer=django.setup
+    ) as executor:
+        return list(executor.map(get_file_metadata, files, chunksize=metadata_extraction_chunk_size))
 
-    entries_to_create = []
-    for file in files:
-        file.resolve()
 
-        try:
-            checksum = inode_checksum_cache.get(file.stat().st_ino) or get_checksum(file)
-        except OSError:
-            logger.exception(f"Could not generate checksum for {str(file)}")
-            raise
-
-        if checksum in metadata_cache:
-            mimetype = get_mimetype(file)
-            entry = Entry(
-                title=file.name,
-                source=source.entry_source,
-                schema=get_schema_from_mimetype(mimetype),
-                description=metadata_cache[checksum].get('description', ''),
-                extra_attributes={
-                    'file': {
-                        'path': str(file),
-                        'checksum': checksum,
-                        'mimetype': mimetype,
-                    },
-                }
-            )
+def is_fingerprint_cacheable(file_path: Path) -> bool:
+    """
+    Archives are extracted again every time they are processed, so their files get new inodes. Their fingerprints are
+    never found again, and a reused inode could return the fingerprint of a different file.
+    """
+    return settings.ARCHIVES_ROOT not in file_path.parents
 
-            for attribute in cached_extra_attributes:
-                if attribute in metadata_cache[checksum]:
-                    entry.extra_attributes[attribute] = metadata_cache[checksum][attribute]
-        else:
-            entry = entry_from_file_path(file, source)
 
-        entry.extra_attributes['backup_date'] = datetime_to_json(backup_date)
+def get_file_fingerprints(files: List[Path], use_cache=True) -> List[FileFingerprint]:
+    """
+    Returns the FileFingerprint of each file, in the same order. Only the files without a fingerprint are read. If
+    use_cache is False, the metadata of all files is read again. The fingerprints of extracted archive files are not
+    saved.
+    """
+    file_keys = [get_fingerprint_key(file) for file in files]
+    uncacheable_keys = {key for file, key in zip(files, file_keys) if not is_fingerprint_cacheable(file)}
 
-        entry.date_on_timeline = get_file_entry_date(entry)  # This could change, so it's not cached
-        if source.is_entry_in_date_range(entry):
-            entries_to_create.append(entry)
+    fingerprints = {}
+    if use_cache:
+        inodes = iter(set(key[1] for key in file_keys if key not in uncacheable_keys))
+        while inodes_chunk := list(islice(inodes, fingerprint_query_size)):
+            for fingerprint in FileFingerprint.objects.filter(inode__in=inodes_chunk):
+                fingerprints[fingerprint.key] = fingerprint
+
+    files_to_read = {}
+    for file, key in zip(files, file_keys):
+        if key not in fingerprints and key not in files_to_read:
+            files_to_read[key] = file
+
+    new_fingerprints = {}
+    for key, metadata in zip(files_to_read.keys(), get_files_metadata(list(files_to_read.values()))):
+        device, inode, size, mtime_ns = key
+        new_fingerprints[key] = FileFingerprint(device=device, inode=inode, size=size, mtime_ns=mtime_ns, **metadata)
+
+    fingerprints.update(
+        (key, fingerprint) for key, fingerprint in new_fingerprints.items() if key in uncacheable_keys
+    )
+    new_fingerprints = {
+        key: fingerprint for key, fingerprint in new_fingerprints.items() if key not in uncacheable_keys
+    }
+    if new_fingerprints:
+        if not use_cache:
+            new_inodes = iter(set(key[1] for key in new_fingerprints.keys()))
+            while inodes_chunk := list(islice(new_inodes, fingerprint_query_size)):
+                FileFingerprint.objects.filter(
+                    id__in=[
+                        fingerprint.id for fingerprint in FileFingerprint.objects.filter(inode__in=inodes_chunk)
+                        if fingerprint.key in new_fingerprints
+                    ]
+                ).delete()
+        FileFingerprint.objects.bulk_create(
+            new_fingerprints.values(), batch_size=fingerprint_query_size, ignore_conflicts=True
+        )
+        fingerprints.update(new_fingerprints)
 
-    source.get_entries().delete()  # TODO: Only delete the entries in the specified directory?
-    return Entry.objects.bulk_create(entries_to_create)
+    return [fingerprints[key] for key in file_keys]
 
 
-def entry_from_file_path(file_path: Path, source: BaseSource) -> Entry:
+def entry_from_fingerprint(file_path: Path, source: BaseSource, fingerprint: FileFingerprint) -> Entry:
     """
-    Creates an Entry template from a file path, filling the fields with file metadata.
+    Creates an Entry template from a file path and its FileFingerprint
     """
-    mimetype = get_mimetype(file_path)
     entry = Entry(
         title=file_path.name,
         source=source.entry_source,
-        schema=get_schema_from_mimetype(mimetype),
+        schema=get_schema_from_mimetype(fingerprint.mimetype),
+        description=fingerprint.description,
         extra_attributes={
             'file': {
-                'checksum': get_checksum(file_path),
-                'path': str(file_path.resolve()),
-                'mimetype': mimetype,
+                'checksum': fingerprint.checksum,
+                'path': str(file_path),
+                'mimetype': fingerprint.mimetype,
             },
+            **deepcopy(fingerprint.extra_attributes),
         },
+        preview_status=PREVIEW_STATUS_PENDING,
     )
-    entry.date_on_timeline = get_file_entry_date(entry)
+    entry.date_on_timeline = get_file_entry_date(entry)  # This could change, so it's not cached
+    return entry
 
-    if mimetype:
-        if mimetype.startswith('image/'):
-            entry.schema = 'file.image'
-            entry.extra_attributes.update(get_image_extra_attributes(file_path))
-        if mimetype.startswith('video/'):
-            entry.schema = 'file.video'
-            try:
-                entry.extra_attributes.update(get_video_extra_attributes(file_path))
-            except FileFormatError:
-                logger.exception(f"Could not read metadata for video {str(file_path)}")
-        if mimetype.startswith('audio/'):
-            entry.schema = 'file.audio'
-            entry.extra_attributes.update(get_audio_extra_attributes(file_path))
-        if mimetype.startswith('text/'):
-            entry.schema = 'file.text'
-            with file_path.open('r') as text_file:
-                entry.description = text_file.read(settings.MAX_PLAINTEXT_PREVIEW_SIZE)
 
-    return entry
+def get_existing_entry_attributes(entries: QuerySet) -> dict:
+    """
+    Previews are stored by checksum. The previews of existing entries are kept when the entries are recreated, so
+    that they are not generated again. Failed previews are not retried more than PREVIEW_MAX_ATTEMPTS times.
+    Descriptions can be edited, so they are also kept.
+    """
+    existing_entries = entries\
+        .filter(extra_attributes__has_key='file')\
+        .values_list(
+            'extra_attributes__file__checksum', 'extra_attributes__previews', 'description', 'preview_status',
+            'preview_attempts'
+        )
+    return {
+        checksum: (previews, description, preview_status, preview_attempts)
+        for checksum, previews, description, preview_status, preview_attempts in existing_entries.iterator()
+    }
+
+
+def entries_from_files(
+    files: List[Path], source: BaseSource, backup_date: datetime, existing_entry_attributes: dict, use_cache=True
+) -> Generator[Entry, None, None]:
+    """
+    Creates the Entries for a list of files. The files are fingerprinted in chunks, so that the metadata of all files
+    is not held in memory at once.
+    """
+    files = iter(files)
+    while files_chunk := list(islice(files, fingerprint_query_size)):
+        for file, fingerprint in zip(files_chunk, get_file_fingerprints(files_chunk, use_cache=use_cache)):
+            entry = entry_from_fingerprint(file, source, fingerprint)
+            entry.extra_attributes['backup_date'] = datetime_to_json(backup_date)
+
+            if fingerprint.checksum in existing_entry_attributes:
+                previews, description, preview_status, preview_attempts = \
+                    existing_entry_attributes[fingerprint.checksum]
+                if previews:
+                    entry.extra_attributes['previews'] = previews
+                if preview_status:
+                    entry.preview_status = preview_status
+                    entry.preview_attempts = preview_attempts
+                if description:
+                    entry.description = description
+
+            if source.is_entry_in_date_range(entry):
+                yield entry
+
+
+def create_entries_from_directory(path: Path, source: BaseSource, backup_date: datetime, use_cache=True) -> int:
+    """
+    Delete and recreate the Entries for the files in a directory. Returns the number of created entries.
+    """
+    files = get_included_files_in_dir(path, settings.TIMELINE_INCLUDE_FILE)
+
+    existing_entry_attributes = get_existing_entry_attributes(source.get_entries()) if use_cache else {}
+    # TODO: Only delete the entries in the specified directory?
+    entries_deleted = source.delete_entries(update_rollups=False)
+    entries_created = source.create_entries(
+        entries_from_files(files, source, backup_date, existing_entry_attributes, use_cache), update_rollups=False
+    )
+    if entries_deleted or entries_created:
+        source.update_daily_rollups()
+    return entries_created
+
+
+def update_entries_for_files(
+    path: Path, source: BaseSource, updated_files: Iterable[Path], deleted_files: Iterable[Path], backup_date: datetime,
+    include_rules: List[Path] = None
+) -> Tuple[int, int]:
+    """
+    Update the Entries for some of the files in a directory, without reprocessing the whole directory. The Entries of
+    the updated and deleted files are deleted, then the Entries of the updated files are recreated. Returns the number
+    of created and updated entries.
+
+    If the include rules are already known, pass them as include_rules. Otherwise, only the include files in the parent
+    directories of the updated files are read.
+    """
+    updated_files = set(updated_files)
+    deleted_files = set(deleted_files) - updated_files
+
+    if include_rules is None:
+        include_rules = get_include_rules_for_files(path, updated_files, settings.TIMELINE_INCLUDE_FILE)
+    files = [
+        file for file in get_files_matching_rules(sorted(updated_files), include_rules)
+        if file.is_file()
+    ]
+
+    old_entry_ids = []
+    old_entry_paths = set()
+    changed_days = set()
+    existing_entry_attributes = {}
+    changed_paths = iter([str(file) for file in updated_files | deleted_files])
+    while changed_paths_chunk := list(islice(changed_paths, fingerprint_query_size)):
+        old_entries = source.get_entries().filter(extra_attributes__file__path__in=changed_paths_chunk)
+        existing_entry_attributes.update(get_existing_entry_attributes(old_entries))
+        for entry_id, entry_path, date_on_timeline in old_entries.values_list(
+            'id', 'extra_attributes__file__path', 'date_on_timeline'
+        ):
+            old_entry_ids.append(entry_id)
+            old_entry_paths.add(entry_path)
+            changed_days.add(local_date(date_on_timeline))
+
+    entries_to_create = list(entries_from_files(files, source, backup_date, existing_entry_attributes))
+    changed_days.update(local_date(entry.date_on_timeline) for entry in entries_to_create)
+
+    deleted_count = Entry.objects.filter(id__in=old_entry_ids).delete()[0]
+    Entry.objects.bulk_create(entries_to_create)
+    source.update_daily_rollups(changed_days)
+
+    updated_count = sum(
+        1 for entry in entries_to_create
+        if entry.extra_attributes['file']['path'] in old_entry_paths
+    )
+    created_count = len(entries_to_create) - updated_count
+    logger.info(f"Updated the entries of {len(updated_files) + len(deleted_files)} changed files in {str(path)}. "
+                f"{created_count} created, {updated_count} updated, {deleted_count - updated_count} deleted.")
+    return created_count, updated_count
+
+
+def entry_from_file_path(file_path: Path, source: BaseSource, fingerprint: FileFingerprint = None) -> Entry:
+    """
+    Creates an Entry template from a file path, filling the fields with file metadata. If the file's fingerprint is
+    already known, it's not read again.
+    """
+    if fingerprint is None:
+        fingerprint = get_file_fingerprints([file_path])[0]
+    return entry_from_fingerprint(file_path.resolve(), source, fingerprint)
 
 
 def get_image_extra_attributes(file_path: Path) -> dict:
@@ -343,25 +617,15 @@ def get_image_extra_attributes(file_path: Path) -> dict:
 
 
 def get_audio_extra_attributes(file_path: Path) -> dict:
-    ffprobe_cmd = subprocess.run(
-        [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=duration,codec_name',
-            '-of', 'json',
-            str(file_path)
-        ],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-
-    if audio_streams := json.loads(ffprobe_cmd.stdout.decode('utf-8'))['streams']:
-        return {
+    if audio_streams := get_media_streams(file_path, 'audio'):
+        metadata = {
             'media': {
-                'duration': int(float(audio_streams[0]['duration'])),
-                'codec': audio_streams[0]['codec_name'],
+                'codec': audio_streams[0].get('codec_name'),
             }
         }
+        if (duration := get_media_duration(file_path, audio_streams[0])) is not None:
+            metadata['media']['duration'] = duration
+        return metadata
     else:
         return {}
 
@@ -369,32 +633,18 @@ def get_audio_extra_attributes(file_path: Path) -> dict:
 def get_video_extra_attributes(file_path: Path) -> dict:
     # TODO: Extract video geolocation
 
-    ffprobe_cmd = subprocess.run(
-        [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'v',
-            '-show_format', '-show_streams',
-            '-of', 'json',
-            str(file_path)
-        ],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-
-    try:
-        video_streams = json.loads(ffprobe_cmd.stdout.decode('utf-8'))['streams']
-    except KeyError:
+    if 'streams' not in probe_media(file_path):
         raise FileFormatError(f"Could not read streams of video file {str(file_path)}.")
 
-    if video_streams:
+    if video_streams := get_media_streams(file_path, 'video'):
         metadata = {
             'media': {
                 'width': int(video_streams[0]['width']),
                 'height': int(video_streams[0]['height'])
             }
         }
-        if 'duration' in video_streams[0]:
-            metadata['media']['duration'] = int(float(video_streams[0]['duration']))
+        if (duration := get_media_duration(file_path, video_streams[0])) is not None:
+            metadata['media']['duration'] = duration
         if 'codec_name' in video_streams[0]:
             metadata['media']['codec'] = video_streams[0].get('codec_name')
         if 'rotate' in video_streams[0].get('tags', {}):
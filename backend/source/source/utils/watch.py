@@ -0,0 +1,126 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from source.utils.files import walk_dir
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWatcher:
+    """
+    Finds changed files by comparing the size and modification time of all files every few seconds. It works
+    everywhere, but it's slow on large directories.
+    """
+    def __init__(self, paths: Iterable[Path], poll_interval: float):
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        self.file_states = self.get_file_states()
+
+    def get_file_states(self) -> Dict[str, Tuple[int, int]]:
+        file_states = {}
+        for path in self.paths:
+            for current_dir, file_entries, subdirs in walk_dir(path):
+                for file_entry in file_entries:
+                    try:
+                        file_stat = file_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    file_states[file_entry.path] = (file_stat.st_size, file_stat.st_mtime_ns)
+        return file_states
+
+    def read_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+        old_file_states = self.file_states
+        self.file_states = self.get_file_states()
+        return {
+            Path(file_path)
+            for file_path in old_file_states.keys() | self.file_states.keys()
+            if old_file_states.get(file_path) != self.file_states.get(file_path)
+        }
+
+
+class InotifyWatcher:
+    """
+    Finds changed files with inotify. Every directory is watched, including the ones created later.
+    """
+    watch_flags = (
+        flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+        if INotify else None
+    )
+
+    def __init__(self, paths: Iterable[Path]):
+        self.inotify = INotify()
+        self.watched_dirs = {}
+        for path in paths:
+            self.watch_dir(path)
+
+    def watch_dir(self, dir_path: Path):
+        for current_dir, file_entries, subdirs in walk_dir(dir_path):
+            try:
+                watch_descriptor = self.inotify.add_watch(current_dir, self.watch_flags)
+            except FileNotFoundError:
+                continue
+            self.watched_dirs[watch_descriptor] = Path(current_dir)
+
+    def unwatch_dir(self, dir_path: Path):
+        for watch_descriptor, watched_dir in list(self.watched_dirs.items()):
+            if watched_dir == dir_path or dir_path in watched_dir.parents:
+                del self.watched_dirs[watch_descriptor]
+                try:
+                    self.inotify.rm_watch(watch_descriptor)
+                except OSError:
+                    pass  # The directory is already gone
+
+    def read_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        changed_paths = set()
+        for event in self.inotify.read(timeout=None if timeout is None else int(timeout * 1000)):
+            if event.mask & flags.IGNORED:
+                self.watched_dirs.pop(event.wd, None)
+                continue
+            if event.wd not in self.watched_dirs:
+                continue
+
+            path = self.watched_dirs[event.wd] / event.name
+            if event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO):
+                self.watch_dir(path)
+            elif event.mask & flags.ISDIR and event.mask & (flags.DELETE | flags.MOVED_FROM):
+                self.unwatch_dir(path)
+            elif event.mask & flags.CREATE:
+                # Wait until the file is written (CLOSE_WRITE)
+                continue
+            changed_paths.add(path)
+        return changed_paths
+
+
+def get_watcher(paths: Iterable[Path], poll_interval: float, use_polling=False):
+    """
+    Returns an InotifyWatcher if inotify is available, or a PollingWatcher
+    """
+    paths = list(paths)
+    if INotify and not use_polling:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            # Too many directories for fs.inotify.max_user_watches, or inotify is not supported
+            logger.exception(f"Could not watch files with inotify. Polling for changes every {poll_interval}s instead.")
+    elif not use_polling:
+        logger.info(f"inotify_simple is not installed. Polling for changes every {poll_interval}s instead.")
+    return PollingWatcher(paths, poll_interval)
+
+
+def read_debounced_changes(watcher, debounce: float) -> Set[Path]:
+    """
+    Waits for changes, then keeps collecting them until nothing changed for {debounce} seconds. Copying a folder of
+    photos triggers many events, but they are processed together.
+    """
+    changed_paths = watcher.read_changes()
+    while new_changed_paths := watcher.read_changes(timeout=debounce):
+        changed_paths.update(new_changed_paths)
+    return changed_paths
@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Entry
+
+
+class EntrySearchFilter(BaseFilterBackend):
+    """
+    Full-text search in the title and description of entries, with ?q=. The results are sorted by relevance.
+
+    The search_vector column is generated by the database (see migration 0014), so it's not a field of the Entry model.
+    """
+    search_param = 'q'
+    search_config = 'simple'
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = request.query_params.get(self.search_param, '').strip()
+        if not search_terms:
+            return queryset
+
+        search_query = SearchQuery(search_terms, config=self.search_config, search_type='websearch')
+        search_vector = RawSQL(f'"{Entry._meta.db_table}"."search_vector"', [], output_field=SearchVectorField())
+        return queryset\
+            .annotate(search_vector=search_vector)\
+            .filter(search_vector=search_query)\
+            .annotate(search_rank=SearchRank(search_vector, search_query))\
+            .order_by('-search_rank', '-date_on_timeline')
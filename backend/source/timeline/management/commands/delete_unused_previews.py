@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from source.utils.files import walk_dir
+from timeline.models import Entry
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deletes the previews that are not used by any entry. Previews are shared by all entries with the same ' \
+           'checksum, so they are only deleted when the last of these entries is deleted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the unused previews, but do not delete them.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Only delete previews older than this many seconds. Previews are generated before their entry is '
+                 'saved, so new previews might not be referenced yet.',
+        )
+
+    def get_used_previews(self) -> set:
+        used_previews = set()
+        entry_previews = Entry.objects\
+            .filter(extra_attributes__has_key='previews')\
+            .values_list('extra_attributes__previews', flat=True)
+        for previews in entry_previews.iterator():
+            used_previews.update(previews.values())
+        return used_previews
+
+    def handle(self, *args, **options):
+        if not settings.PREVIEWS_ROOT.exists():
+            return
+
+        # Get the existing previews first. A preview created while the entries are queried is too new to be deleted.
+        max_mtime = time.time() - options['min_age']
+        existing_previews = []
+        preview_dirs = []
+        for current_dir, file_entries, subdirs in walk_dir(settings.PREVIEWS_ROOT):
+            # The modification times of the directories are read before anything is deleted, because deleting a file
+            # changes the modification time of its directory.
+            preview_dirs.append((current_dir, os.path.getmtime(current_dir)))
+            for file_entry in file_entries:
+                try:
+                    if file_entry.stat().st_mtime < max_mtime:
+                        existing_previews.append(file_entry.path)
+                except FileNotFoundError:
+                    continue
+        used_previews = self.get_used_previews()
+
+        deleted_count = 0
+        deleted_size = 0
+        for preview_path in existing_previews:
+            if preview_path in used_previews:
+                continue
+            try:
+                preview_size = os.path.getsize(preview_path)
+                if options['dry_run']:
+                    logger.info(f"Unused preview: {preview_path}")
+                else:
+                    Path(preview_path).unlink()
+            except FileNotFoundError:
+                continue
+            deleted_count += 1
+            deleted_size += preview_size
+
+        if not options['dry_run']:
+            # Deepest directories first, so that their parents are empty when they are checked. New directories are
+            # kept, because a preview might be written there.
+            for preview_dir, preview_dir_mtime in reversed(preview_dirs):
+                try:
+                    if preview_dir != str(settings.PREVIEWS_ROOT) and preview_dir_mtime < max_mtime \
+                            and not os.listdir(preview_dir):
+                        os.rmdir(preview_dir)
+                except OSError:
+                    continue
+
+        logger.info(
+            f"{'Found' if options['dry_run'] else 'Deleted'} {deleted_count} unused previews "
+            f"({round(deleted_size / 1024 / 1024)} MB)"
+        )
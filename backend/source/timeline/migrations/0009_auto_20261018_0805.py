@@ -0,0 +1,21 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0008_auto_20210603_1102'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entry',
+            name='timeline_en_date_on_d4f91d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['date_on_timeline', 'id'], name='timeline_en_date_on_160cf1_idx'),
+        ),
+    ]
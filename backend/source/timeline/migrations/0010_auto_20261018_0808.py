@@ -0,0 +1,60 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_daily_rollups(app, schema_editor):
+    """
+    Create the rollups for the existing entries
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO timeline_dailyentryrollup
+                (date, source, schema, entry_count, first_entry_date, last_entry_date, first_image_entry_id)
+            SELECT
+                (date_on_timeline AT TIME ZONE %(time_zone)s)::date,
+                source,
+                schema,
+                COUNT(id),
+                MIN(date_on_timeline),
+                MAX(date_on_timeline),
+                MIN(id) FILTER (WHERE schema LIKE 'file.image%%' OR schema LIKE '%%.image')
+            FROM timeline_entry
+            GROUP BY 1, source, schema
+            """,
+            {'time_zone': settings.DAILY_ROLLUP_TIME_ZONE}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0009_auto_20261018_0805'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEntryRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(max_length=100)),
+                ('schema', models.CharField(max_length=100)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('first_entry_date', models.DateTimeField(null=True)),
+                ('last_entry_date', models.DateTimeField(null=True)),
+                ('first_image_entry_id', models.IntegerField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailyentryrollup',
+            index=models.Index(fields=['source', 'date'], name='timeline_da_source_615cf7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyentryrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'source', 'schema'), name='timeline_rollup_unique_day'),
+        ),
+        migrations.RunPython(create_daily_rollups, migrations.RunPython.noop),
+    ]
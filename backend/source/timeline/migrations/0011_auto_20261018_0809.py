@@ -0,0 +1,52 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+# The JSON attribute that the polling sources used to find existing entries
+external_id_attributes = {
+    'TwitterSource/': 'post_id',
+    'HackerNewsSource/': 'post_id',
+    'RssSource/': 'post_id',
+    'TraktSource/': 'trakt_event_id',
+}
+
+
+def copy_external_ids(app, schema_editor):
+    """
+    Copy the external IDs from extra_attributes. If an ID appears more than once, only the newest entry gets it.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        for source_prefix, attribute in external_id_attributes.items():
+            cursor.execute(
+                """
+                UPDATE timeline_entry
+                SET external_id = extra_attributes->>%(attribute)s
+                WHERE id IN (
+                    SELECT MAX(id)
+                    FROM timeline_entry
+                    WHERE source LIKE %(source_prefix)s AND extra_attributes ? %(attribute)s
+                    GROUP BY source, schema, extra_attributes->>%(attribute)s
+                )
+                """,
+                {'attribute': attribute, 'source_prefix': source_prefix + '%'}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0010_auto_20261018_0808'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='external_id',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_external_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='entry',
+            constraint=models.UniqueConstraint(condition=models.Q(external_id__isnull=False), fields=('source', 'schema', 'external_id'), name='timeline_entry_unique_external_id'),
+        ),
+    ]
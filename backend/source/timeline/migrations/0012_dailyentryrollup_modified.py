@@ -0,0 +1,18 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0011_auto_20261018_0809'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyentryrollup',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
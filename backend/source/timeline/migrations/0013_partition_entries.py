@@ -0,0 +1,76 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:14
+from datetime import datetime
+
+import pytz
+from django.db import migrations, models
+
+# The indexes of the partitioned table. Their names match the indexes Django created on the old table.
+entry_indexes = [
+    'CREATE INDEX timeline_en_schema_e31fe6_idx ON timeline_entry (schema)',
+    'CREATE INDEX timeline_en_source_daa269_idx ON timeline_entry (source)',
+    'CREATE INDEX timeline_en_date_on_160cf1_idx ON timeline_entry (date_on_timeline, id)',
+    'CREATE UNIQUE INDEX timeline_entry_unique_external_id '
+    'ON timeline_entry (source, schema, external_id, date_on_timeline) WHERE external_id IS NOT NULL',
+]
+
+
+def partition_entry_table(app, schema_editor):
+    """
+    Replace the entry table with a table partitioned by year of date_on_timeline
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE timeline_entry RENAME TO timeline_entry_unpartitioned")
+        cursor.execute(
+            "CREATE TABLE timeline_entry (LIKE timeline_entry_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (date_on_timeline)"
+        )
+        cursor.execute("ALTER SEQUENCE timeline_entry_id_seq OWNED BY timeline_entry.id")
+        cursor.execute("CREATE TABLE timeline_entry_default PARTITION OF timeline_entry DEFAULT")
+
+        cursor.execute(
+            "SELECT DISTINCT EXTRACT(YEAR FROM date_on_timeline AT TIME ZONE 'UTC')::integer "
+            "FROM timeline_entry_unpartitioned"
+        )
+        years = {year for (year, ) in cursor.fetchall()}
+        current_year = datetime.now(pytz.UTC).year
+        years.update([current_year, current_year + 1])
+        for year in sorted(years):
+            cursor.execute(
+                f"CREATE TABLE timeline_entry_y{year} PARTITION OF timeline_entry FOR VALUES FROM (%s) TO (%s)",
+                [datetime(year, 1, 1, tzinfo=pytz.UTC), datetime(year + 1, 1, 1, tzinfo=pytz.UTC)]
+            )
+
+        cursor.execute("INSERT INTO timeline_entry SELECT * FROM timeline_entry_unpartitioned")
+        cursor.execute("DROP TABLE timeline_entry_unpartitioned")
+
+        # Indexes are faster to build after the entries are copied
+        cursor.execute(
+            "ALTER TABLE timeline_entry ADD CONSTRAINT timeline_entry_pkey PRIMARY KEY (id, date_on_timeline)"
+        )
+        for index_sql in entry_indexes:
+            cursor.execute(index_sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0012_dailyentryrollup_modified'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_entry_table),
+            ],
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='entry',
+                    name='timeline_entry_unique_external_id',
+                ),
+                migrations.AddConstraint(
+                    model_name='entry',
+                    constraint=models.UniqueConstraint(condition=models.Q(external_id__isnull=False), fields=('source', 'schema', 'external_id', 'date_on_timeline'), name='timeline_entry_unique_external_id'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0013_partition_entries'),
+    ]
+
+    # The search vector is generated by the database, so it is not a field of the Entry model
+    operations = [
+        migrations.RunSQL(
+            """
+            ALTER TABLE timeline_entry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))
+            ) STORED;
+            CREATE INDEX timeline_entry_search_vector_idx ON timeline_entry USING GIN (search_vector);
+            """,
+            """
+            DROP INDEX timeline_entry_search_vector_idx;
+            ALTER TABLE timeline_entry DROP COLUMN search_vector;
+            """
+        ),
+    ]
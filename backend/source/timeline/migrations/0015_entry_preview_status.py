@@ -0,0 +1,36 @@
+# Generated by Django 3.1.2 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0014_entry_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='preview_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('pending', 'pending'), ('done', 'done'), ('failed', 'failed')], max_length=10, null=True),
+        ),
+        # File entries that already have previews are done. The others are generated by the next import.
+        migrations.RunSQL(
+            """
+            UPDATE timeline_entry
+            SET preview_status = CASE WHEN extra_attributes ? 'previews' THEN 'done' ELSE 'pending' END
+            WHERE extra_attributes ? 'file'
+            """,
+            migrations.RunSQL.noop
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(preview_status__in=['pending', 'failed']), fields=['source', 'preview_status'], name='timeline_entry_preview_queue'),
+        ),
+    ]
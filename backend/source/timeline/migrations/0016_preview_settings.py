@@ -0,0 +1,21 @@
+# Generated by Django 3.1.2 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0015_entry_preview_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreviewSettings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('settings_hash', models.CharField(max_length=32)),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,8 +1,17 @@
 from django.db import models
 from django.utils import timezone
 
+PREVIEW_STATUS_PENDING = 'pending'
+PREVIEW_STATUS_DONE = 'done'
+PREVIEW_STATUS_FAILED = 'failed'
+PREVIEW_STATUSES = (PREVIEW_STATUS_PENDING, PREVIEW_STATUS_DONE, PREVIEW_STATUS_FAILED)
+
 
 class Entry(models.Model):
+    """
+    The entry table is partitioned by year of date_on_timeline (see timeline.utils.partitions). Because of this, the
+    primary key and the unique constraints in the database also include date_on_timeline.
+    """
     date_on_timeline = models.DateTimeField(default=timezone.now)
 
     source = models.CharField(max_length=100)
@@ -11,9 +20,66 @@ class Entry(models.Model):
     description = models.TextField(blank=True)
     extra_attributes = models.JSONField(blank=True, default=dict)
 
+    # The ID of this entry in the source it comes from (a tweet ID, a Trakt event ID...), used to update the entry
+    external_id = models.TextField(null=True, blank=True)
+
+    # Whether the previews of a file entry must be generated. It's null for entries without a file.
+    preview_status = models.CharField(
+        max_length=10,
+        null=True,
+        blank=True,
+        choices=[(status, status) for status in PREVIEW_STATUSES]
+    )
+    preview_attempts = models.PositiveSmallIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=['schema']),
             models.Index(fields=['source']),
-            models.Index(fields=['date_on_timeline']),
+            models.Index(fields=['date_on_timeline', 'id']),
+            # Only the entries that need previews are indexed, so the preview queue stays small
+            models.Index(
+                fields=['source', 'preview_status'],
+                condition=models.Q(preview_status__in=[PREVIEW_STATUS_PENDING, PREVIEW_STATUS_FAILED]),
+                name='timeline_entry_preview_queue'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'schema', 'external_id', 'date_on_timeline'],
+                condition=models.Q(external_id__isnull=False),
+                name='timeline_entry_unique_external_id'
+            ),
         ]
+
+
+class DailyEntryRollup(models.Model):
+    """
+    Summary of the entries of a source for a given day and schema. It's updated whenever entries change, so that the
+    timeline can tell which days have entries without scanning the Entry table.
+    """
+    date = models.DateField()
+    source = models.CharField(max_length=100)
+    schema = models.CharField(max_length=100)
+    entry_count = models.PositiveIntegerField(default=0)
+    first_entry_date = models.DateTimeField(null=True)
+    last_entry_date = models.DateTimeField(null=True)
+    first_image_entry_id = models.IntegerField(null=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'source', 'schema'], name='timeline_rollup_unique_day'),
+        ]
+        indexes = [
+            models.Index(fields=['source', 'date']),
+        ]
+
+
+class PreviewSettings(models.Model):
+    """
+    A hash of the preview settings that the existing previews were generated with. The entries with outdated previews
+    are only looked for when these settings change. There is only one row.
+    """
+    settings_hash = models.CharField(max_length=32)
+    modified = models.DateTimeField(auto_now=True)
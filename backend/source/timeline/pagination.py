@@ -0,0 +1,129 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class EntryCursorPagination(BasePagination):
+    """
+    Keyset pagination for entries, ordered by (date_on_timeline, id). Unlike LimitOffsetPagination, it never counts
+    the entries and never uses OFFSET, so the last page is as fast to fetch as the first one.
+
+    The cursor is an opaque string that encodes the position of the first or last entry of the page, and the direction.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 1000
+    max_page_size = 10000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if self.reverse:
+            queryset = queryset.order_by('-date_on_timeline', '-id')
+        else:
+            queryset = queryset.order_by('date_on_timeline', 'id')
+
+        if self.position:
+            position_date, position_id = self.position
+            if self.reverse:
+                queryset = queryset\
+                    .filter(date_on_timeline__lte=position_date)\
+                    .exclude(date_on_timeline=position_date, id__gte=position_id)
+            else:
+                queryset = queryset\
+                    .filter(date_on_timeline__gte=position_date)\
+                    .exclude(date_on_timeline=position_date, id__lte=position_id)
+
+        # Fetch one extra entry to know if there is a page after this one
+        results = list(queryset[:self.page_size + 1])
+        has_following_page = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_following_page
+        else:
+            self.has_next = has_following_page
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Went back past the first entry. The next page starts at the beginning.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Went past the last entry. The previous page ends at the end.
+            return replace_query_param(self.base_url, self.cursor_query_param, self._encode(None, reverse=True))
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, entry, reverse: bool) -> str:
+        if isinstance(entry, dict):  # Entries from a .values() queryset
+            position = (entry['date_on_timeline'], entry['id'])
+        else:
+            position = (entry.date_on_timeline, entry.id)
+        return replace_query_param(self.base_url, self.cursor_query_param, self._encode(position, reverse))
+
+    @staticmethod
+    def _encode(position, reverse: bool) -> str:
+        if position:
+            cursor = f"{position[0].isoformat()}|{position[1]}|{int(reverse)}"
+        else:
+            cursor = f"||{int(reverse)}"
+        return urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded_cursor = request.query_params.get(self.cursor_query_param)
+        if not encoded_cursor:
+            return None, False
+
+        try:
+            date_str, entry_id, reverse = urlsafe_b64decode(encoded_cursor.encode('ascii')).decode('ascii').split('|')
+            position = (datetime.fromisoformat(date_str), int(entry_id)) if date_str else None
+            return position, bool(int(reverse))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
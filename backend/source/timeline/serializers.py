@@ -1,12 +1,21 @@
+from typing import Iterable
+
 from rest_framework import serializers
 
-from .models import Entry
+from .models import Entry, DailyEntryRollup
 
 
 class EntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = Entry
         fields = '__all__'
+        read_only_fields = ['preview_status', 'preview_attempts']
+
+
+class DailyEntryRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyEntryRollup
+        exclude = ['id']
 
 
 _entry_fields_cache = None
@@ -26,4 +35,19 @@ def serialize_entry(entry: Entry):
     return {
         field: getattr(entry, field)
         for field in get_entry_fields()
-    }
\ No newline at end of file
+    }
+
+
+def serialize_entry_values(values: dict, fields: Iterable[str]):
+    """
+    Serializer for partial entries, from a .values() queryset. "extra_attributes.<key>" fields are nested in
+    extra_attributes. Missing attributes are left out.
+    """
+    serialized_entry = {}
+    for field in fields:
+        if field.startswith('extra_attributes.'):
+            if values[field] is not None:
+                serialized_entry.setdefault('extra_attributes', {})[field.split('.', 1)[1]] = values[field]
+        else:
+            serialized_entry[field] = values[field]
+    return serialized_entry
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
+
+from timeline.models import Entry
+from timeline.utils.rollups import update_daily_rollups, local_date, touch_daily_rollup
+
+
+rollup_fields = {'date_on_timeline', 'source', 'schema'}
+
+
+@receiver(post_save, sender=Entry)
+def update_rollups_on_entry_save(sender, instance: Entry, update_fields=None, **kwargs):
+    # There is no post_delete receiver, because it would stop Django from deleting entries in bulk. Code that deletes
+    # entries must update the rollups itself.
+    date_on_timeline = instance.date_on_timeline
+    if isinstance(date_on_timeline, str):
+        date_on_timeline = parse_datetime(date_on_timeline)
+
+    if update_fields and not rollup_fields.intersection(update_fields):
+        # The entry counts did not change, but the day's entries did
+        touch_daily_rollup(instance.source, instance.schema, local_date(date_on_timeline))
+    else:
+        update_daily_rollups(instance.source, [local_date(date_on_timeline)])
@@ -1,11 +1,13 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import EntryViewSet
+from .views import EntryViewSet, DailyEntryRollupViewSet
 
 router = routers.DefaultRouter()
 router.register(r'entries', EntryViewSet)
+router.register(r'days', DailyEntryRollupViewSet)
 
 urlpatterns = [
+    path('entries/export.ndjson', EntryViewSet.as_view({'get': 'export'}), name='entry-export'),
     path('', include(router.urls)),
 ]
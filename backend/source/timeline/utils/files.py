@@ -1,11 +1,30 @@
+import logging
+import os
 import subprocess
 from pathlib import Path
+from typing import List, Tuple, Optional
+
+from PIL import Image, ImageOps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+image_preview_quality = 90
+
+
+def get_temporary_path(output_path: Path) -> Path:
+    """
+    Previews are written to a temporary file, then moved to output_path. This way, there are no half-written previews,
+    and two processes can generate the same preview at the same time.
+    """
+    return output_path.with_name(f".{output_path.stem}.{os.getpid()}{output_path.suffix}")
 
 
 def generate_pdf_preview(input_path: Path, output_path: Path, max_dimensions: (int, int), overwrite=False):
     if output_path.exists() and not overwrite:
         raise FileExistsError
 
+    temporary_path = get_temporary_path(output_path)
     try:
         command = [
             'convert',
@@ -16,10 +35,12 @@ def generate_pdf_preview(input_path: Path, output_path: Path, max_dimensions: (i
             '-resize', f"{max_dimensions[0]}x{max_dimensions[1]}>",
             '-flatten',
             '-strip',
-            str(output_path),
+            str(temporary_path),
         ]
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        temporary_path.replace(output_path)
     except subprocess.CalledProcessError as exc:
+        temporary_path.unlink(missing_ok=True)
         command = " ".join(exc.cmd)
         raise Exception(
             f'Could not generate image preview.\n'
@@ -32,70 +53,156 @@ class VideoDurationError(ValueError):
     pass
 
 
-def generate_video_preview(input_path: Path, output_path: Path, video_duration: int, max_dimensions: (int, int),
+def get_video_preview_intervals(video_duration: int) -> List[Tuple[int, int]]:
+    """
+    The (start, duration) of the samples that make up a video preview
+    """
+    sample_count = 10
+    sample_duration = 2
+    if video_duration <= 10:
+        sample_count = 1
+        sample_duration = video_duration
+    elif video_duration <= 30:
+        sample_count = 5
+        sample_duration = 1
+    elif video_duration <= 5 * 60:
+        sample_count = 5
+        sample_duration = 2
+
+    # Take a [sample_duration] video sample at every 1/[sample_count] of the video
+    return [
+        (int(i / sample_count * video_duration), sample_duration)
+        for i in range(0, sample_count)
+    ]
+
+
+def get_video_scale_filter(max_dimensions: Tuple[int, int]) -> str:
+    """
+    Scales a video to fit max size, but doesn't enlarge, crop, or change the aspect ratio
+    """
+    return f"scale=ceil(iw*min(1\\,min({max_dimensions[0]}/iw\\,{max_dimensions[1]}/ih))/2)*2:-2"
+
+
+def generate_video_posters(input_path: Path, posters: List[Tuple[Path, Tuple[int, int]]], video_duration: Optional[int],
                            overwrite=False):
-    if output_path.exists() and not overwrite:
-        raise FileExistsError
+    """
+    Generates still images of a video in different sizes, given as (output path, max dimensions), with a single ffmpeg
+    command. ffmpeg seeks to the keyframe before 10% of the video, and only decodes that frame. It's much faster than
+    generating video previews. If the duration is unknown, the first frame is used.
+    """
+    if not overwrite:
+        posters = [
+            (output_path, max_dimensions) for output_path, max_dimensions in posters if not output_path.exists()
+        ]
+    if not posters:
+        return
+
+    # The first frame is often black
+    poster_time = round((video_duration or 0) / 10, 2)
+
+    try:
+        ffmpeg_filter = f"[0:v]split={len(posters)}" + "".join(f"[frame{index}]" for index in range(0, len(posters)))
+        outputs = []
+        for index, (output_path, max_dimensions) in enumerate(posters):
+            ffmpeg_filter += f";[frame{index}]{get_video_scale_filter(max_dimensions)}[out{index}]"
+            outputs += [
+                '-map', f'[out{index}]',
+                '-frames:v', '1',
+                '-q:v', '3',
+                str(get_temporary_path(output_path)),
+            ]
+
+        command = [
+            'ffmpeg',
+            '-y',  # Overwrite if exists, without asking
+            '-noaccurate_seek',
+            '-ss', str(poster_time),
+            '-i', str(input_path),
+            '-filter_complex', ffmpeg_filter,
+            *outputs,
+        ]
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        for output_path, max_dimensions in posters:
+            get_temporary_path(output_path).replace(output_path)
+    except subprocess.CalledProcessError as exc:
+        for output_path, max_dimensions in posters:
+            get_temporary_path(output_path).unlink(missing_ok=True)
+
+        command = " ".join(exc.cmd)
+        raise Exception(
+            f'Could not generate video poster.\n'
+            f"FFMPEG COMMAND:\n{command}\n"
+            f"FFMPEG OUTPUT:\n{exc.stderr.decode('UTF-8')}"
+        )
+
+
+def generate_video_previews(input_path: Path, previews: List[Tuple[Path, Tuple[int, int]]], video_duration: int,
+                            overwrite=False):
+    """
+    Generates previews of a video in different sizes, given as (output path, max dimensions), with a single ffmpeg
+    command. Each sample is opened as a separate input that starts with -ss, so ffmpeg seeks to the sample instead of
+    decoding the video up to it. The samples are concatenated once, then split into all sizes.
+    """
+    if not overwrite:
+        previews = [
+            (output_path, max_dimensions) for output_path, max_dimensions in previews if not output_path.exists()
+        ]
+    if not previews:
+        return
 
     if video_duration is None or video_duration == 0:
         raise VideoDurationError(
             f'Could not generate video preview. Video duration is {video_duration}.'
         )
 
+    preview_intervals = get_video_preview_intervals(video_duration)
+
     try:
-        sample_count = 10
-        sample_duration = 2
-        if video_duration <= 10:
-            sample_count = 1
-            sample_duration = video_duration
-        elif video_duration <= 30:
-            sample_count = 5
-            sample_duration = 1
-        elif video_duration <= 5 * 60:
-            sample_count = 5
-            sample_duration = 2
-
-        # Take a [sample_duration] video sample at every 1/[sample_count] of the video
-        preview_intervals = [
-            (sample_start, sample_start + sample_duration)
-            for sample_start in [
-                int(i / sample_count * video_duration)
-                for i in range(0, sample_count)
-            ]
-        ]
+        inputs = []
+        for sample_start, sample_duration in preview_intervals:
+            inputs += ['-ss', str(sample_start), '-t', str(sample_duration), '-i', str(input_path)]
 
-        # Cut the sample
-        ffmpeg_filter = " ".join(
-            f"[0:v]trim={start}:{end},setpts=PTS-STARTPTS[v{index}];"
-            for index, (start, end) in enumerate(preview_intervals)  # noqa
+        # Concatenate the samples, then split them into one stream per preview size
+        ffmpeg_filter = "".join(
+            f"[{index}:v]setpts=PTS-STARTPTS[v{index}];"
+            for index in range(0, len(preview_intervals))
         )
-
-        # Concatenate the samples
         ffmpeg_filter += "".join(
-            f"[v{i}]" for i in range(0, len(preview_intervals))
+            f"[v{index}]" for index in range(0, len(preview_intervals))
+        )
+        ffmpeg_filter += f"concat=n={len(preview_intervals)}:v=1[allclips];"
+        ffmpeg_filter += f"[allclips]split={len(previews)}" + "".join(
+            f"[clips{index}]" for index in range(0, len(previews))
         )
-        ffmpeg_filter += f"concat=n={sample_count}:v=1[allclips];"
 
-        # Scale the output to fit max size, but don't enlarge, don't crop, and don't change aspect ratio
-        ffmpeg_filter += \
-            f"[allclips]scale=ceil(iw*min(1\\,min({max_dimensions[0]}/iw\\,{max_dimensions[1]}/ih))/2)*2:-2[out]"
+        outputs = []
+        for index, (output_path, max_dimensions) in enumerate(previews):
+            ffmpeg_filter += f";[clips{index}]{get_video_scale_filter(max_dimensions)}[out{index}]"
+            outputs += [
+                '-map', f'[out{index}]',
+                '-codec:v', 'libx264',
+                '-profile:v', 'baseline',
+                '-level', '3.0',
+                '-preset', settings.VIDEO_PREVIEW_PRESET,
+                '-threads', '0',
+                '-movflags', '+faststart',
+                str(get_temporary_path(output_path)),
+            ]
 
         command = [
             'ffmpeg',
             '-y',  # Overwrite if exists, without asking
-            '-i', str(input_path),
+            *inputs,
             '-filter_complex', ffmpeg_filter,
-            '-map', '[out]',
-            '-codec:v', 'libx264',
-            '-profile:v', 'baseline',
-            '-level', '3.0',
-            '-preset', 'slow',
-            '-threads', '0',
-            '-movflags', '+faststart',
-            str(output_path),
+            *outputs,
         ]
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        for output_path, max_dimensions in previews:
+            get_temporary_path(output_path).replace(output_path)
     except subprocess.CalledProcessError as exc:
+        for output_path, max_dimensions in previews:
+            get_temporary_path(output_path).unlink(missing_ok=True)
+
         command = " ".join(exc.cmd)
         raise Exception(
             f'Could not generate video preview.\n'
@@ -108,6 +215,7 @@ def generate_image_preview(input_path: Path, output_path: Path, max_dimensions:
     if output_path.exists() and not overwrite:
         raise FileExistsError
 
+    temporary_path = get_temporary_path(output_path)
     try:
         command = [
             'convert',
@@ -116,13 +224,79 @@ def generate_image_preview(input_path: Path, output_path: Path, max_dimensions:
             '-strip',
             '-thumbnail', f"{max_dimensions[0]}x{max_dimensions[1]}>",
             f"{str(input_path)}[0]",
-            str(output_path),
+            str(temporary_path),
         ]
         subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        temporary_path.replace(output_path)
     except subprocess.CalledProcessError as exc:
+        temporary_path.unlink(missing_ok=True)
         command = " ".join(exc.cmd)
         raise Exception(
             f'Could not generate image preview.\n'
             f"IMAGEMAGICK COMMAND:\n{command}\n"
             f"IMAGEMAGICK OUTPUT:\n{exc.stderr.decode('UTF-8')}"
         )
+
+
+def get_preview_size(image_size: (int, int), max_dimensions: (int, int)) -> (int, int):
+    """
+    The size of an image resized to fit max_dimensions. Images are never enlarged, like ImageMagick's "WxH>".
+    """
+    scale = min(1, max_dimensions[0] / image_size[0], max_dimensions[1] / image_size[1])
+    return max(1, round(image_size[0] * scale)), max(1, round(image_size[1] * scale))
+
+
+def generate_image_previews(input_path: Path, previews: List[Tuple[Path, Tuple[int, int]]], overwrite=False):
+    """
+    Generates previews of an image in different sizes, given as (output path, max dimensions). The image is only
+    decoded once, at the smallest scale that the largest preview needs. Each preview is resized from the next larger
+    one. Images that Pillow can't read are converted with ImageMagick.
+    """
+    if not overwrite:
+        previews = [
+            (output_path, max_dimensions) for output_path, max_dimensions in previews if not output_path.exists()
+        ]
+    if not previews:
+        return
+
+    try:
+        with Image.open(input_path) as image:
+            # EXIF orientations 5 to 8 are rotated by 90°. The preview's width is the image's height.
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                draft_previews = [(output_path, (height, width)) for output_path, (width, height) in previews]
+            else:
+                draft_previews = previews
+            draft_size = max(
+                (get_preview_size(image.size, max_dimensions) for output_path, max_dimensions in draft_previews),
+                key=lambda size: size[0] * size[1]
+            )
+            # Only JPEG files support draft mode. It decodes the image at 1/2, 1/4 or 1/8 scale, which is much faster.
+            image.draft('RGB', draft_size)
+
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+                # Flatten transparent images on a white background, like ImageMagick's -flatten
+                image = image.convert('RGBA')
+                background = Image.new('RGBA', image.size, 'white')
+                background.alpha_composite(image)
+                image = background
+            image = image.convert('RGB')
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.debug(f"Could not read {str(input_path)} with Pillow. Using ImageMagick instead.")
+        for output_path, max_dimensions in previews:
+            generate_image_preview(input_path, output_path, max_dimensions, overwrite=True)
+        return
+
+    # Make the largest previews first, then resize them to make the smaller ones
+    previews = sorted(
+        previews,
+        key=lambda preview: get_preview_size(image.size, preview[1]),
+        reverse=True
+    )
+    for output_path, max_dimensions in previews:
+        preview_size = get_preview_size(image.size, max_dimensions)
+        if preview_size != image.size:
+            image = image.resize(preview_size, Image.LANCZOS)
+        temporary_path = get_temporary_path(output_path)
+        image.save(temporary_path, 'JPEG', quality=image_preview_quality)
+        temporary_path.replace(output_path)
@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime
+from typing import Set
+
+import pytz
+from django.db import connection, transaction
+
+from timeline.models import Entry
+
+logger = logging.getLogger(__name__)
+
+entry_table = Entry._meta.db_table
+default_partition = f'{entry_table}_default'
+
+
+def year_partition_name(year: int) -> str:
+    return f'{entry_table}_y{year}'
+
+
+def year_range(year: int):
+    return datetime(year, 1, 1, tzinfo=pytz.UTC), datetime(year + 1, 1, 1, tzinfo=pytz.UTC)
+
+
+def get_partitioned_years(cursor) -> Set[int]:
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = %s::regclass",
+        [entry_table]
+    )
+    prefix = year_partition_name(0)[:-1]
+    return {
+        int(partition_name[len(prefix):])
+        for (partition_name, ) in cursor.fetchall()
+        if partition_name.startswith(prefix)
+    }
+
+
+def create_year_partition(cursor, year: int):
+    """
+    Creates the partition for a year, and moves this year's entries from the default partition to the new partition
+    """
+    partition_name = year_partition_name(year)
+    year_start, year_end = year_range(year)
+    cursor.execute(
+        f"CREATE TABLE {partition_name} "
+        f"(LIKE {entry_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+    )
+
+    # Generated columns like search_vector can't be copied. They are generated again.
+    columns = ', '.join(field.column for field in Entry._meta.concrete_fields)
+    cursor.execute(
+        f"WITH moved_entries AS ("
+        f"    DELETE FROM {default_partition} WHERE date_on_timeline >= %s AND date_on_timeline < %s RETURNING *"
+        f") INSERT INTO {partition_name} ({columns}) SELECT {columns} FROM moved_entries",
+        [year_start, year_end]
+    )
+    moved_entry_count = cursor.rowcount
+    cursor.execute(
+        f"ALTER TABLE {entry_table} ATTACH PARTITION {partition_name} FOR VALUES FROM (%s) TO (%s)",
+        [year_start, year_end]
+    )
+    logger.info(f"Created entry partition for {year}. {moved_entry_count} entries moved from the default partition.")
+
+
+def create_entry_partitions():
+    """
+    Creates the yearly partitions for the entries in the default partition, for this year and for next year. New
+    entries that don't fit in any partition end up in the default partition until this runs.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT EXTRACT(YEAR FROM date_on_timeline AT TIME ZONE 'UTC')::integer FROM {default_partition}"
+        )
+        years = {year for (year, ) in cursor.fetchall()}
+        current_year = datetime.now(pytz.UTC).year
+        years.update([current_year, current_year + 1])
+
+        for year in sorted(years - get_partitioned_years(cursor)):
+            create_year_partition(cursor, year)
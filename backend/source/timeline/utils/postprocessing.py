@@ -1,38 +1,104 @@
+import hashlib
+import json
 import logging
+import multiprocessing
+import operator
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from functools import reduce
 from pathlib import Path
-from typing import List, Callable
+from typing import List, Callable, Tuple, Optional, Dict
 
+import django
 from django.conf import settings
-from django.db import transaction
+from django.db import transaction, connection
+from django.db.models import Q, QuerySet
 
 from source.models.source import BaseSource
-from timeline.models import Entry
-from timeline.utils.files import generate_pdf_preview, generate_video_preview, generate_image_preview, \
-    VideoDurationError
+from timeline.models import Entry, PreviewSettings, PREVIEW_STATUS_PENDING, PREVIEW_STATUS_DONE, \
+    PREVIEW_STATUS_FAILED
+from timeline.utils.files import generate_pdf_preview, generate_video_previews, generate_image_previews, \
+    generate_video_posters, VideoDurationError
+from timeline.utils.rollups import update_daily_rollups, local_date, get_entry_dates_by_source, touch_daily_rollups
 
 logger = logging.getLogger(__name__)
 
+preview_query_size = 100
 
-def _get_previews_dir(entry: Entry, mkdir=False):
-    previews_dir = (settings.PREVIEWS_ROOT / Path(entry.source) / entry.extra_attributes['file']['checksum'])
+
+def _get_previews_dir(checksum: str, mkdir=False) -> Path:
+    """
+    Previews are stored by checksum, so identical files share the same previews, even if they come from different
+    sources. The directories are sharded (ab/cd/abcd...) so that they don't contain too many files.
+    """
+    previews_dir = settings.PREVIEWS_ROOT / checksum[0:2] / checksum[2:4] / checksum
     if mkdir:
         previews_dir.mkdir(parents=True, exist_ok=True)
     return previews_dir
 
 
+def _get_preview_settings(preview_type: str) -> Dict[str, Tuple[dict, str]]:
+    """
+    Returns the parameters and the file extension of each preview of this type
+    """
+    if preview_type == 'image':
+        return {
+            preview_name: (preview_params, 'jpg')
+            for preview_name, preview_params in settings.IMAGE_PREVIEW_SIZES.items()
+        }
+    elif preview_type == 'video':
+        return {
+            **{
+                preview_name: (preview_params, 'jpg')
+                for preview_name, preview_params in settings.VIDEO_POSTER_SIZES.items()
+            },
+            **{
+                preview_name: ({**preview_params, 'preset': settings.VIDEO_PREVIEW_PRESET}, 'mp4')
+                for preview_name, preview_params in settings.VIDEO_PREVIEW_SIZES.items()
+            },
+        }
+    elif preview_type == 'document':
+        return {
+            preview_name: (preview_params, 'png')
+            for preview_name, preview_params in settings.DOCUMENT_PREVIEW_SIZES.items()
+        }
+    return {}
+
+
+def _get_preview_file_name(preview_name: str, preview_params: dict, extension: str) -> str:
+    """
+    The name of a preview contains a hash of its parameters. If the parameters change, a new preview is generated,
+    instead of reusing the preview generated with the old parameters.
+    """
+    params_hash = hashlib.md5(json.dumps(preview_params, sort_keys=True).encode()).hexdigest()[:8]
+    return f'{preview_name}-{params_hash}.{extension}'
+
+
+def _get_preview_paths(entry: Entry, preview_type: str) -> Dict[str, Tuple[Path, Tuple[int, int]]]:
+    """
+    Returns the path and the maximum dimensions of each preview of an entry, according to the current settings.
+    Existing previews with the same parameters have the same path, so only the missing and outdated previews are
+    generated. Legacy previews (named before the parameters were part of their file name) are always regenerated.
+    """
+    previews_dir = _get_previews_dir(entry.extra_attributes['file']['checksum'], mkdir=True)
+    return {
+        preview_name: (
+            previews_dir / _get_preview_file_name(preview_name, preview_params, extension),
+            (preview_params['width'], preview_params['height'])
+        )
+        for preview_name, (preview_params, extension) in _get_preview_settings(preview_type).items()
+    }
+
+
 def _generate_pdf_previews(entry: Entry, overwrite=False):
     original_path = Path(entry.extra_attributes['file']['path'])
-    entry.extra_attributes['previews'] = entry.extra_attributes.get('previews', {})
+    previews = _get_preview_paths(entry, 'document')
+    entry.extra_attributes['previews'] = {}
 
-    for preview_name, preview_params in settings.DOCUMENT_PREVIEW_SIZES.items():
-        preview_path = _get_previews_dir(entry, mkdir=True) / f'{preview_name}.png'
+    for preview_name, (preview_path, max_dimensions) in previews.items():
         try:
-            generate_pdf_preview(
-                original_path,
-                preview_path,
-                (preview_params['width'], preview_params['height']),
-                overwrite=overwrite
-            )
+            generate_pdf_preview(original_path, preview_path, max_dimensions, overwrite=overwrite)
             entry.extra_attributes['previews'][preview_name] = str(preview_path)
         except FileExistsError:
             logger.debug(f'"{preview_name}" preview for #{entry.pk} already exists.')
@@ -51,57 +117,62 @@ def _generate_image_previews(entry: Entry, overwrite=False):
         logger.warning(f"Image entry #{entry.id} ({entry.extra_attributes['file']['path']}) does not have a width")
         return
 
-    entry.extra_attributes['previews'] = {}
-    for preview_name, preview_params in settings.IMAGE_PREVIEW_SIZES.items():
-        preview_path = _get_previews_dir(entry, mkdir=True) / f'{preview_name}.jpg'
-        try:
-            generate_image_preview(
-                original_path,
-                preview_path,
-                (preview_params['width'], preview_params['height']),
-                overwrite=overwrite
-            )
-            entry.extra_attributes['previews'][preview_name] = str(preview_path)
-        except FileExistsError:
-            logger.debug(f'"{preview_name}" preview for #{entry.pk} already exists.')
-            entry.extra_attributes['previews'][preview_name] = str(preview_path)
-        except KeyboardInterrupt:
-            raise
-        except:
-            logger.exception(f'Could not generate image preview for entry #{entry.pk} ({str(original_path)}).')
-            raise
+    previews = _get_preview_paths(entry, 'image')
+    try:
+        generate_image_previews(original_path, list(previews.values()), overwrite=overwrite)
+    except KeyboardInterrupt:
+        raise
+    except:
+        logger.exception(f'Could not generate image preview for entry #{entry.pk} ({str(original_path)}).')
+        raise
+
+    entry.extra_attributes['previews'] = {
+        preview_name: str(preview_path) for preview_name, (preview_path, max_dimensions) in previews.items()
+    }
 
 
 def _generate_video_previews(entry: Entry, overwrite=False):
     original_path = Path(entry.extra_attributes['file']['path'])
+    # Posters don't need the duration, so videos without one still get posters
+    video_duration = entry.extra_attributes.get('media', {}).get('duration')
 
-    if 'duration' not in entry.extra_attributes.get('media', {}):
-        logger.warning(f"Video entry #{entry.id} ({entry.extra_attributes['file']['path']}) does not have a duration")
+    previews = _get_preview_paths(entry, 'video')
+    posters = {preview_name: previews.pop(preview_name) for preview_name in settings.VIDEO_POSTER_SIZES}
+    entry.extra_attributes['previews'] = {}
+    try:
+        # The posters are much faster to generate, so they are generated first
+        generate_video_posters(
+            original_path, list(posters.values()), video_duration=video_duration, overwrite=overwrite
+        )
+        entry.extra_attributes['previews'] = {
+            preview_name: str(preview_path) for preview_name, (preview_path, max_dimensions) in posters.items()
+        }
+
+        generate_video_previews(
+            original_path, list(previews.values()), video_duration=video_duration, overwrite=overwrite
+        )
+    except VideoDurationError as e:
+        # Without a duration, the video previews can't be generated. They are not queued again.
+        logger.debug(f'Could not generate video preview for entry #{entry.pk} ({str(original_path)}). {str(e)}')
+        entry.extra_attributes['previews_unavailable'] = list(previews.keys())
         return
+    except KeyboardInterrupt:
+        raise
+    except:
+        logger.exception(f'Could not generate video preview for entry #{entry.pk} ({str(original_path)}).')
+        raise
 
-    entry.extra_attributes['previews'] = {}
-    for preview_name, preview_params in settings.VIDEO_PREVIEW_SIZES.items():
-        preview_path = _get_previews_dir(entry, mkdir=True) / f'{preview_name}.mp4'
-        try:
-            generate_video_preview(
-                original_path,
-                preview_path,
-                video_duration=entry.extra_attributes['media']['duration'],
-                max_dimensions=(preview_params['width'], preview_params['height']),
-                overwrite=overwrite
-            )
-            entry.extra_attributes['previews'][preview_name] = str(preview_path)
-        except FileExistsError:
-            logger.debug(f'"{preview_name}" preview for #{entry.pk} already exists.')
-            entry.extra_attributes['previews'][preview_name] = str(preview_path)
-        except VideoDurationError as e:
-            logger.debug(f'Could not generate video preview for entry #{entry.pk} ({str(original_path)}). {str(e)}')
-            break  # Same error will happen for other preview sizes
-        except KeyboardInterrupt:
-            raise
-        except:
-            logger.exception(f'Could not generate video preview for entry #{entry.pk} ({str(original_path)}).')
-            raise
+    entry.extra_attributes['previews'].update({
+        preview_name: str(preview_path) for preview_name, (preview_path, max_dimensions) in previews.items()
+    })
+    entry.extra_attributes.pop('previews_unavailable', None)
+
+
+preview_mimetype_filters = {
+    'image': Q(extra_attributes__file__mimetype__startswith='image/'),
+    'video': Q(extra_attributes__file__mimetype__startswith='video/'),
+    'document': Q(extra_attributes__file__mimetype='application/pdf'),
+}
 
 
 def _get_preview_processing_tasks(entry: Entry) -> List[Callable[[Entry], None]]:
@@ -122,17 +193,276 @@ def _get_preview_processing_tasks(entry: Entry) -> List[Callable[[Entry], None]]
     return tasks
 
 
+def _run_preview_processing_tasks(entry: Entry, overwrite=False) -> bool:
+    """
+    Generates the previews of an entry, without saving it. Returns False if a preview could not be generated.
+    """
+    processing_tasks = _get_preview_processing_tasks(entry)
+    if processing_tasks:
+        logger.debug(f"Generating preview for {str(entry)} at {entry.extra_attributes['file']['path']}")
+
+    succeeded = True
+    for task in processing_tasks:
+        try:
+            task(entry, overwrite=overwrite)
+        except KeyboardInterrupt:
+            raise
+        except:
+            logger.exception(f"Could not generate preview for entry #{entry.pk} "
+                             f"({ str(Path(entry.extra_attributes['file']['path'])) }).")
+            succeeded = False
+    return succeeded
+
+
+def _generate_previews_in_worker(entry: Entry, overwrite=False) -> Tuple[dict, bool]:
+    """
+    Runs in a preview worker process. The worker does not use the database; it returns the entry's updated
+    extra_attributes, and the main process saves them.
+    """
+    succeeded = _run_preview_processing_tasks(entry, overwrite=overwrite)
+    return entry.extra_attributes, succeeded
+
+
+def _update_entries(entries: QuerySet, **values) -> int:
+    """
+    Updates entries in bulk. The preview status is part of the entries returned by the API, but bulk updates don't
+    trigger signals, so the rollups of their days are touched to change the timeline's ETags.
+    """
+    changed_dates = get_entry_dates_by_source(entries)
+    updated_count = entries.update(**values)
+    for source, dates in changed_dates.items():
+        touch_daily_rollups(source, dates)
+    return updated_count
+
+
+def _save_preview_status(entry: Entry, succeeded: bool):
+    entry.preview_status = PREVIEW_STATUS_DONE if succeeded else PREVIEW_STATUS_FAILED
+    entry.preview_attempts += 1
+    entry.save(update_fields=['extra_attributes', 'preview_status', 'preview_attempts'])
+
+
+def generate_entry_previews(entry: Entry, overwrite=False):
+    """
+    Generates the previews of a single entry, and saves them
+    """
+    _save_preview_status(entry, _run_preview_processing_tasks(entry, overwrite=overwrite))
+
+
+def _get_preview_type(entry: Entry) -> Optional[str]:
+    mimetype = entry.extra_attributes.get('file', {}).get('mimetype') or 'unknown'
+    if mimetype.startswith('image/'):
+        return 'image'
+    elif mimetype.startswith('video/'):
+        return 'video'
+    elif mimetype == 'application/pdf':
+        return 'document'
+    return None
+
+
+def _get_existing_preview(entry: Entry, preview_name: str) -> Optional[Path]:
+    preview_path = entry.extra_attributes.get('previews', {}).get(preview_name)
+    if preview_path and Path(preview_path).exists():
+        return Path(preview_path)
+    return None
+
+
+def _generate_entry_preview(entry: Entry, preview_name: str) -> Optional[Path]:
+    """
+    Generates a single preview of an entry, without saving the entry. Video previews are too slow to generate while
+    a request waits, so only their posters are generated. Returns None if the preview can't be generated now.
+    """
+    preview_type = _get_preview_type(entry)
+    media = entry.extra_attributes.get('media', {})
+    if preview_type == 'video' and preview_name not in settings.VIDEO_POSTER_SIZES:
+        return None
+    if preview_type == 'image' and 'width' not in media:
+        return None
+
+    original_path = Path(entry.extra_attributes['file']['path'])
+    preview_path, max_dimensions = _get_preview_paths(entry, preview_type)[preview_name]
+    try:
+        if preview_type == 'image':
+            generate_image_previews(original_path, [(preview_path, max_dimensions)])
+        elif preview_type == 'video':
+            generate_video_posters(
+                original_path, [(preview_path, max_dimensions)], video_duration=media.get('duration')
+            )
+        elif preview_type == 'document':
+            generate_pdf_preview(original_path, preview_path, max_dimensions)
+    except FileExistsError:
+        pass
+    except VideoDurationError as e:
+        logger.debug(f'Could not generate "{preview_name}" preview for entry #{entry.pk} ({str(original_path)}). '
+                     f'{str(e)}')
+        return None
+    return preview_path if preview_path.exists() else None
+
+
+def get_entry_preview(entry: Entry, preview_name: str) -> Optional[Path]:
+    """
+    Returns the path of an entry's preview, and generates it if it does not exist yet. Only the requested preview is
+    generated; the other previews are left to the preview queue. Concurrent requests for the same file wait for the
+    first one to generate the preview. Returns None if the entry has no such preview, or if it can't be generated now.
+
+    The preview is generated outside of a transaction. The lock is held by the database session, not by a
+    transaction, and it's released as soon as the preview is saved.
+    """
+    if preview_path := _get_existing_preview(entry, preview_name):
+        return preview_path
+
+    if preview_name not in _get_preview_settings(_get_preview_type(entry)):
+        return None
+
+    lock_key = f"previews:{entry.extra_attributes['file']['checksum']}"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [lock_key])
+    try:
+        # Another request might have generated the preview while this one was waiting for the lock
+        entry.refresh_from_db()
+        if preview_path := _get_existing_preview(entry, preview_name):
+            return preview_path
+        if entry.preview_status == PREVIEW_STATUS_FAILED and entry.preview_attempts >= settings.PREVIEW_MAX_ATTEMPTS:
+            return None
+
+        try:
+            preview_path = _generate_entry_preview(entry, preview_name)
+        except KeyboardInterrupt:
+            raise
+        except:
+            logger.exception(f'Could not generate "{preview_name}" preview for entry #{entry.pk} '
+                             f"({entry.extra_attributes['file']['path']}).")
+            return None
+
+        if preview_path:
+            # The preview status is unchanged. The other previews of this entry are still generated in the background.
+            entry.extra_attributes['previews'] = {
+                **(entry.extra_attributes.get('previews') or {}),
+                preview_name: str(preview_path),
+            }
+            entry.save(update_fields=['extra_attributes'])
+        return preview_path
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [lock_key])
+
+
+def get_preview_queue() -> QuerySet:
+    """
+    The entries that need previews: new entries, and entries whose previews failed fewer than PREVIEW_MAX_ATTEMPTS
+    times. This query uses the timeline_entry_preview_queue index.
+    """
+    return Entry.objects.filter(
+        Q(preview_status=PREVIEW_STATUS_PENDING)
+        | Q(preview_status=PREVIEW_STATUS_FAILED, preview_attempts__lt=settings.PREVIEW_MAX_ATTEMPTS)
+    )
+
+
+def queue_outdated_previews(entries: QuerySet, accept_legacy_previews=False) -> int:
+    """
+    Adds the entries with missing or outdated previews back to the preview queue. This happens when the preview
+    settings change. Entries without previews are ignored; some files (broken images) don't have any. Previews that
+    could not be generated (previews_unavailable) are not missing.
+
+    The parameters of legacy previews (named before the parameters were part of their file name) are unknown. If
+    accept_legacy_previews is True, they are assumed to be up to date. Otherwise, they are outdated.
+    """
+    outdated_previews = Q()
+    for preview_type, mimetype_filter in preview_mimetype_filters.items():
+        outdated_previews_of_type = Q()
+        for preview_name, (preview_params, extension) in _get_preview_settings(preview_type).items():
+            preview_key = f'extra_attributes__previews__{preview_name}'
+            preview_file_name = _get_preview_file_name(preview_name, preview_params, extension)
+            is_missing = ~Q(extra_attributes__previews__has_key=preview_name)\
+                & ~Q(extra_attributes__contains={'previews_unavailable': [preview_name]})
+            is_outdated = Q(extra_attributes__previews__has_key=preview_name)\
+                & ~Q(**{f'{preview_key}__endswith': f'/{preview_file_name}'})
+            if accept_legacy_previews:
+                is_outdated &= ~Q(**{f'{preview_key}__endswith': f'/{preview_name}.{extension}'})
+            outdated_previews_of_type |= is_missing | is_outdated
+        outdated_previews |= mimetype_filter & outdated_previews_of_type
+
+    has_previews = Q(extra_attributes__has_key='previews') & ~Q(extra_attributes__previews={})
+    # Videos without a duration used to get no previews at all. They can have posters.
+    videos_without_posters = preview_mimetype_filters['video'] & ~has_previews\
+        & ~Q(extra_attributes__has_key='previews_unavailable')
+    outdated_entries = entries\
+        .filter(preview_status=PREVIEW_STATUS_DONE)\
+        .filter((has_previews & outdated_previews) | videos_without_posters)
+    return _update_entries(outdated_entries, preview_status=PREVIEW_STATUS_PENDING, preview_attempts=0)
+
+
+def _get_preview_settings_hash() -> str:
+    preview_settings = {preview_type: _get_preview_settings(preview_type) for preview_type in preview_mimetype_filters}
+    return hashlib.md5(json.dumps(preview_settings, sort_keys=True).encode()).hexdigest()
+
+
+def queue_outdated_previews_if_settings_changed() -> int:
+    """
+    Looking for outdated previews scans every file entry, so it's only done when the preview settings changed since
+    the last time. All entries are checked, not just those of one source, because the new settings are saved.
+    """
+    settings_hash = _get_preview_settings_hash()
+    with transaction.atomic():
+        preview_settings, created = PreviewSettings.objects.select_for_update().get_or_create(
+            pk=1, defaults={'settings_hash': ''}
+        )
+        if preview_settings.settings_hash == settings_hash:
+            return 0
+
+        # The settings hash is empty on the first run after the upgrade. The legacy previews were generated with the
+        # current settings, unless they changed during the upgrade. After that, they are outdated.
+        outdated_entry_count = queue_outdated_previews(
+            Entry.objects.all(), accept_legacy_previews=not preview_settings.settings_hash
+        )
+        preview_settings.settings_hash = settings_hash
+        preview_settings.save()
+    return outdated_entry_count
+
+
+def delete_orphaned_entries(entries: QuerySet) -> int:
+    """
+    Deletes the file entries whose file does not exist anymore (for example if the backup gets deleted)
+    """
+    orphaned_entry_ids = []
+    deleted_entry_days = defaultdict(set)
+    entry_files = entries.values_list('id', 'source', 'date_on_timeline', 'extra_attributes__file__path')
+    for entry_id, entry_source, date_on_timeline, file_path in entry_files.iterator():
+        if not Path(file_path).exists():
+            logger.error(f"Entry #{entry_id} does not exist at {file_path}")
+            orphaned_entry_ids.append(entry_id)
+            deleted_entry_days[entry_source].add(local_date(date_on_timeline))
+
+    with transaction.atomic():
+        Entry.objects.filter(id__in=orphaned_entry_ids).delete()
+        for entry_source, days in deleted_entry_days.items():
+            update_daily_rollups(entry_source, days)
+    return len(orphaned_entry_ids)
+
+
 def generate_previews(source: BaseSource=None, force=False):
     """
-    Generates previews on the timeline
+    Generates previews on the timeline. Only the entries in the preview queue are processed, unless force is True.
+    The most recent entries are processed first.
+
+    Each type of file (image, video, document) has its own pool of PREVIEW_WORKERS processes, so that slow video
+    previews don't hold back image previews. Each entry is saved as soon as its previews are generated.
     """
-    entry_filters = {'extra_attributes__has_key': 'file'}
+    if force:
+        entries = Entry.objects.filter(extra_attributes__has_key='file')
+    else:
+        if outdated_entry_count := queue_outdated_previews_if_settings_changed():
+            logger.info(f"The previews of {outdated_entry_count} entries are outdated")
+        entries = get_preview_queue()
     if source:
-        entry_filters['source'] = source.entry_source
+        entries = entries.filter(source=source.entry_source)
+    # The most recent entries are the most likely to be viewed
+    entries = entries.order_by('-date_on_timeline')
 
-    entries = Entry.objects.filter(**entry_filters)
+    entry_count = entries.count()
+    if entry_count == 0:
+        logger.debug(f"No previews to generate{f' for {source}' if source else ''}")
+        return
 
-    entry_count = len(entries)
     log_message = f"Generating previews for {entry_count} entries"
     if source:
         log_message += f' from {source}'
@@ -140,34 +470,85 @@ def generate_previews(source: BaseSource=None, force=False):
         log_message += ', and overwriting existing previews'
 
     logger.info(log_message)
-    missing_entry_count = 0
+    missing_entry_count = delete_orphaned_entries(entries)
 
-    with transaction.atomic():
-        for index, entry in enumerate(entries):
-            # Delete orphaned entries (for example if the backup gets deleted)
-            if not Path(entry.extra_attributes['file']['path']).exists():
-                logger.error(f"Entry #{entry.id} does not exist at {entry.extra_attributes['file']['path']}")
-                missing_entry_count += 1
-                entry.delete()
-                continue
-
-            logger.debug(f"Processing entry {index + 1}/{entry_count}"
-                         f" (#{entry.id} - {entry.extra_attributes['file']['path']})")
-
-            if processing_tasks := _get_preview_processing_tasks(entry):
-                logger.debug(f"Generating preview for {str(entry)} at {entry.extra_attributes['file']['path']}")
-                for task in processing_tasks:
+    # Some files (text, audio) don't have previews
+    entries_without_previews = entries\
+        .exclude(reduce(operator.or_, preview_mimetype_filters.values()))\
+        .exclude(preview_status=PREVIEW_STATUS_DONE)
+    _update_entries(entries_without_previews, preview_status=PREVIEW_STATUS_DONE)
+
+    pools = {}
+    entry_iterators = {}
+    pending_entries = {}  # Future -> Entry
+    pending_counts = defaultdict(int)
+    generated_count = 0
+    failed_count = 0
+    try:
+        # The workers are started by a fork server, not forked from this process, so they don't share its database
+        # connection. They set up Django before they receive any entries.
+        mp_context = multiprocessing.get_context('forkserver')
+        for preview_type, worker_count in settings.PREVIEW_WORKERS.items():
+            pools[preview_type] = ProcessPoolExecutor(
+                max_workers=worker_count, mp_context=mp_context, initializer=django.setup
+            )
+            entry_iterators[preview_type] = entries\
+                .filter(preview_mimetype_filters[preview_type])\
+                .iterator(chunk_size=preview_query_size)
+
+        while entry_iterators or pending_entries:
+            # Keep every pool busy, but don't load all entries in memory
+            for preview_type, entry_iterator in list(entry_iterators.items()):
+                while pending_counts[preview_type] < settings.PREVIEW_WORKERS[preview_type] * 2:
+                    entry = next(entry_iterator, None)
+                    if entry is None:
+                        del entry_iterators[preview_type]
+                        break
                     try:
-                        task(entry, overwrite=force)
-                    except KeyboardInterrupt:
-                        raise
-                    except:
-                        logger.exception(f"Could not generate preview for entry #{entry.pk} "
-                                         f"({ str(Path(entry.extra_attributes['file']['path'])) }).")
-                entry.save()
-
-        if missing_entry_count == 0:
-            logger.info(f"Generated previews for {len(entries)} entries.")
-        else:
-            logger.warning(f"Generated previews for {len(entries)} entries, "
-                           f"{missing_entry_count} orphaned entries removed")
+                        future = pools[preview_type].submit(_generate_previews_in_worker, entry, overwrite=force)
+                    except BrokenProcessPool:
+                        # A worker died, so the pool can't process the other entries of this type
+                        logger.exception(f"The {preview_type} preview workers stopped. Could not generate the "
+                                         f"previews of entry #{entry.pk} ({entry.extra_attributes['file']['path']}).")
+                        _save_preview_status(entry, False)
+                        failed_count += 1
+                        del entry_iterators[preview_type]
+                        break
+                    pending_entries[future] = (preview_type, entry)
+                    pending_counts[preview_type] += 1
+
+            done_futures, _ = wait(pending_entries.keys(), return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                preview_type, entry = pending_entries.pop(future)
+                pending_counts[preview_type] -= 1
+                try:
+                    entry.extra_attributes, succeeded = future.result()
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    logger.exception(f"Could not generate the previews of entry #{entry.pk} "
+                                     f"({entry.extra_attributes['file']['path']}).")
+                    succeeded = False
+
+                try:
+                    _save_preview_status(entry, succeeded)
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    logger.exception(f"Could not save the previews of entry #{entry.pk} "
+                                     f"({entry.extra_attributes['file']['path']}).")
+                    succeeded = False
+
+                if succeeded:
+                    generated_count += 1
+                else:
+                    failed_count += 1
+    finally:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+
+    if missing_entry_count == 0 and failed_count == 0:
+        logger.info(f"Generated previews for {generated_count} entries.")
+    else:
+        logger.warning(f"Generated previews for {generated_count} entries, {failed_count} failed, "
+                       f"{missing_entry_count} orphaned entries removed")
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Set, Tuple, Dict
+
+import pytz
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Max, Q, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from timeline.models import Entry, DailyEntryRollup
+
+image_schemas_filter = Q(schema__startswith='file.image') | Q(schema__endswith='.image')
+
+
+def rollup_timezone():
+    return pytz.timezone(settings.DAILY_ROLLUP_TIME_ZONE)
+
+
+def local_date(date_on_timeline: datetime) -> date:
+    """
+    The day on which a date appears on the timeline
+    """
+    return date_on_timeline.astimezone(rollup_timezone()).date()
+
+
+def local_day_range(day: date) -> Tuple[datetime, datetime]:
+    """
+    The start (inclusive) and end (exclusive) of a day on the timeline
+    """
+    tz = rollup_timezone()
+    return (
+        tz.localize(datetime.combine(day, time.min)),
+        tz.localize(datetime.combine(day + timedelta(days=1), time.min)),
+    )
+
+
+def get_entry_dates(entries: QuerySet) -> Set[date]:
+    """
+    The days on which these entries appear on the timeline
+    """
+    # TruncDate truncates in the current timezone
+    with timezone.override(rollup_timezone()):
+        return set(
+            entries.annotate(date=TruncDate('date_on_timeline')).values_list('date', flat=True).order_by().distinct()
+        )
+
+
+rollup_value_fields = ('entry_count', 'first_entry_date', 'last_entry_date', 'first_image_entry_id')
+
+
+def get_entry_dates_by_source(entries: QuerySet) -> Dict[str, Set[date]]:
+    """
+    The days on which these entries appear on the timeline, for each source
+    """
+    dates_by_source = defaultdict(set)
+    # TruncDate truncates in the current timezone
+    with timezone.override(rollup_timezone()):
+        entry_dates = entries.annotate(date=TruncDate('date_on_timeline')).values_list('source', 'date')
+        for source, day in entry_dates.order_by().distinct():
+            dates_by_source[source].add(day)
+    return dates_by_source
+
+
+def update_daily_rollups(source: str, dates: Iterable[date] = None, touch=False):
+    """
+    Recalculates the daily rollups of a source. If dates are given, only these days are recalculated.
+
+    Only the rollups whose values changed are written, so the modified date of the others, and the ETags built from it,
+    stay the same. If touch is True, the recalculated rollups are marked as modified even if their values are the
+    same, because the content of their entries changed.
+    """
+    entries = Entry.objects.filter(source=source)
+    rollups = DailyEntryRollup.objects.filter(source=source)
+
+    if dates is not None:
+        dates = set(dates)
+        if not dates:
+            return
+
+        date_filter = Q()
+        for day in dates:
+            day_start, day_end = local_day_range(day)
+            date_filter |= Q(date_on_timeline__gte=day_start, date_on_timeline__lt=day_end)
+        entries = entries.filter(date_filter)
+        rollups = rollups.filter(date__in=dates)
+
+    # TruncDate truncates in the current timezone
+    with timezone.override(rollup_timezone()):
+        rollup_values = {
+            (values['date'], values['schema']): values
+            for values in entries
+            .annotate(date=TruncDate('date_on_timeline'))
+            .values('date', 'schema')
+            .annotate(
+                entry_count=Count('id'),
+                first_entry_date=Min('date_on_timeline'),
+                last_entry_date=Max('date_on_timeline'),
+                first_image_entry_id=Min('id', filter=image_schemas_filter),
+            )
+            .order_by()
+        }
+
+    with transaction.atomic():
+        deleted_rollup_ids = []
+        changed_rollups = []
+        now = timezone.now()
+        for rollup in rollups.select_for_update():
+            values = rollup_values.pop((rollup.date, rollup.schema), None)
+            if values is None:
+                deleted_rollup_ids.append(rollup.id)
+            elif touch or any(getattr(rollup, field) != values[field] for field in rollup_value_fields):
+                for field in rollup_value_fields:
+                    setattr(rollup, field, values[field])
+                rollup.modified = now  # bulk_update() does not set auto_now fields
+                changed_rollups.append(rollup)
+
+        DailyEntryRollup.objects.filter(id__in=deleted_rollup_ids).delete()
+        DailyEntryRollup.objects.bulk_update(changed_rollups, [*rollup_value_fields, 'modified'], batch_size=1000)
+        DailyEntryRollup.objects.bulk_create(
+            DailyEntryRollup(source=source, **values) for values in rollup_values.values()
+        )
+
+
+def touch_daily_rollup(source: str, schema: str, day: date):
+    """
+    Marks a day as modified, without recalculating it
+    """
+    DailyEntryRollup.objects.filter(source=source, schema=schema, date=day).update(modified=timezone.now())
+
+
+def touch_daily_rollups(source: str, dates: Iterable[date]):
+    """
+    Marks the days of a source as modified, without recalculating them
+    """
+    DailyEntryRollup.objects.filter(source=source, date__in=set(dates)).update(modified=timezone.now())
+
+
+def daily_rollups_version(date_from: datetime = None, date_until: datetime = None) -> tuple:
+    """
+    A value that changes whenever the entries between two dates change. It's used to build ETags.
+    """
+    rollups = DailyEntryRollup.objects.all()
+    if date_from:
+        rollups = rollups.filter(date__gte=local_date(date_from))
+    if date_until:
+        rollups = rollups.filter(date__lte=local_date(date_until))
+    version = rollups.aggregate(Count('id'), Sum('entry_count'), Max('modified'))
+    return version['id__count'], version['entry_count__sum'], version['modified__max']
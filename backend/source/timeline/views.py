@@ -1,12 +1,31 @@
+import hashlib
 import json
+import mimetypes
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import quote
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.fields.json import KeyTransform
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 
-from .models import Entry
-from .serializers import EntrySerializer
+from .filters import EntrySearchFilter
+from .models import Entry, DailyEntryRollup
+from .pagination import EntryCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import EntrySerializer, DailyEntryRollupSerializer, serialize_entry, serialize_entry_values, \
+    get_entry_fields
+from .utils.postprocessing import get_entry_preview
+from .utils.rollups import update_daily_rollups, local_date, daily_rollups_version
 
 
 class EntryViewSet(viewsets.ModelViewSet):
@@ -19,16 +38,209 @@ class EntryViewSet(viewsets.ModelViewSet):
 
     queryset = Entry.objects.all().order_by('date_on_timeline')
     serializer_class = EntrySerializer
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, EntrySearchFilter, OrderingFilter]
     filterset_fields = {
         'date_on_timeline': ['gte', 'lte', 'exact', 'gt', 'lt'],
         'schema': ['exact', 'contains'],
         'source': ['exact', 'contains'],
     }
+    cursor_pagination_class = EntryCursorPagination
+    export_chunk_size = 5000
+
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination if the client asks for it with ?pagination=cursor, or if it follows a cursor link
+        """
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            cursor_query_param = self.cursor_pagination_class.cursor_query_param
+            if query_params.get('pagination') == 'cursor' or cursor_query_param in query_params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export is always NDJSON, no matter what the client accepts
+        return super().perform_content_negotiation(request, force=(force or self.action == 'export'))
+
+    def get_list_etag(self):
+        """
+        An ETag for the list of entries. It changes when the entries in the requested date range change, so the client
+        can revalidate a day without downloading it again. Returns None if the date filters can't be parsed.
+        """
+        date_filters = {
+            'from': ['date_on_timeline__gte', 'date_on_timeline__gt', 'date_on_timeline__exact', 'date_on_timeline'],
+            'until': ['date_on_timeline__lte', 'date_on_timeline__lt', 'date_on_timeline__exact', 'date_on_timeline'],
+        }
+        date_range = {}
+        for bound, query_params in date_filters.items():
+            for query_param in query_params:
+                if value := self.request.query_params.get(query_param):
+                    try:
+                        date_range[bound] = parse_datetime(value)
+                    except ValueError:
+                        date_range[bound] = None
+                    if date_range[bound] is None:
+                        return None
+                    break
+
+        version = daily_rollups_version(date_range.get('from'), date_range.get('until'))
+        etag_source = repr((version, self.request.get_full_path(), self.request.accepted_media_type))
+        return quote_etag(hashlib.md5(etag_source.encode()).hexdigest())
+
+    def get_requested_fields(self) -> Optional[List[str]]:
+        """
+        The fields requested with ?fields=id,title,extra_attributes.location and ?omit=extra_attributes. Returns None if
+        all fields are requested.
+        """
+        fields_param = self.request.query_params.get('fields')
+        omit_param = self.request.query_params.get('omit')
+        if not fields_param and not omit_param:
+            return None
+
+        entry_fields = list(get_entry_fields())
+        fields = [field.strip() for field in fields_param.split(',') if field.strip()] if fields_param else entry_fields
+        omitted_fields = {field.strip() for field in omit_param.split(',') if field.strip()} if omit_param else set()
+
+        invalid_fields = [
+            field for field in fields
+            if field not in entry_fields and not (field.startswith('extra_attributes.') and field != 'extra_attributes.')
+        ]
+        if invalid_fields:
+            raise ValidationError({'fields': f"Invalid fields: {', '.join(invalid_fields)}"})
+        invalid_omitted_fields = omitted_fields.difference(entry_fields)
+        if invalid_omitted_fields:
+            raise ValidationError({'omit': f"Invalid fields: {', '.join(sorted(invalid_omitted_fields))}"})
+
+        if 'extra_attributes' in fields or 'extra_attributes' in omitted_fields:
+            # The whole extra_attributes field is already included, or it's excluded
+            omitted_fields.update(field for field in fields if field.startswith('extra_attributes.'))
+
+        requested_fields = []
+        for field in fields:
+            if field not in omitted_fields and field not in requested_fields:
+                requested_fields.append(field)
+        return requested_fields
+
+    def get_projection(self, queryset: QuerySet) -> Tuple[QuerySet, Callable]:
+        """
+        Only query the requested fields. Returns the queryset, and the function to serialize its rows.
+        """
+        fields = self.get_requested_fields()
+        if fields is None:
+            # serialize_entry is much faster than EntrySerializer, and it makes a big difference with long lists
+            return queryset, serialize_entry
+
+        # The paginator always needs the id and date
+        queried_fields = {'id', 'date_on_timeline'}.union(
+            field for field in fields if not field.startswith('extra_attributes.')
+        )
+        extra_attributes = {
+            field: KeyTransform(field.split('.', 1)[1], 'extra_attributes')
+            for field in fields if field.startswith('extra_attributes.')
+        }
+        queryset = queryset.values(*queried_fields, **extra_attributes)
+        return queryset, lambda values: serialize_entry_values(values, fields)
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag()
+        if etag and etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            queryset, serialize = self.get_projection(self.filter_queryset(self.get_queryset()))
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                response = self.get_paginated_response([serialize(entry) for entry in page])
+            else:
+                response = Response([serialize(entry) for entry in queryset])
+
+        if etag:
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(serialize_entry(self.get_object()))
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=isinstance(request.data, list))
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        return HttpResponse(json.dumps(serializer.data, ensure_ascii=False), content_type="application/json")
\ No newline at end of file
+        return HttpResponse(json.dumps(serializer.data, ensure_ascii=False), content_type="application/json")
+
+    def perform_update(self, serializer):
+        # The entry might move to another day or source. The rollup of its old day must be updated too.
+        old_source, old_date = serializer.instance.source, serializer.instance.date_on_timeline
+        super().perform_update(serializer)
+        update_daily_rollups(old_source, [local_date(old_date)])
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        update_daily_rollups(instance.source, [local_date(instance.date_on_timeline)])
+
+    @action(detail=True, url_path=r'preview/(?P<preview_name>[^/.]+)')
+    def preview(self, request, preview_name, *args, **kwargs):
+        """
+        Serves a preview of the entry through nginx (X-Accel-Redirect). If the preview does not exist yet, it's
+        generated first.
+        """
+        entry = self.get_object()
+        preview_path = get_entry_preview(entry, preview_name)
+        try:
+            # nginx only serves the files under PREVIEWS_ROOT
+            relative_preview_path = preview_path.relative_to(settings.PREVIEWS_ROOT)
+        except (AttributeError, ValueError):
+            raise NotFound(f'Entry #{entry.pk} does not have a "{preview_name}" preview.')
+
+        response = HttpResponse(content_type=mimetypes.guess_type(preview_path.name)[0])
+        response['X-Accel-Redirect'] = quote(f'{settings.PREVIEWS_URL}{relative_preview_path.as_posix()}')
+        return response
+
+    def export(self, request, *args, **kwargs):
+        """
+        Streams the filtered entries as newline-delimited JSON. The entries are read with a server-side cursor, so the
+        memory usage does not depend on the number of entries.
+        """
+        queryset, serialize = self.get_projection(self.filter_queryset(self.get_queryset()))
+        entries = queryset.iterator(chunk_size=self.export_chunk_size)
+        renderer = FastJSONRenderer()
+
+        def ndjson_lines():
+            for entry in entries:
+                yield renderer.render(serialize(entry)) + b'\n'
+
+        return StreamingHttpResponse(ndjson_lines(), content_type='application/x-ndjson')
+
+
+class DailyEntryRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Number of entries per day, schema and source. Use ?from=YYYY-MM-DD and ?to=YYYY-MM-DD to get a date range.
+    """
+    required_alternate_scopes = {
+        "GET": [["entry:read"]],
+    }
+
+    queryset = DailyEntryRollup.objects.all().order_by('date', 'source', 'schema')
+    serializer_class = DailyEntryRollupSerializer
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = {
+        'schema': ['exact', 'contains'],
+        'source': ['exact', 'contains'],
+    }
+    ordering_fields = ['date', 'entry_count']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for query_param, lookup in (('from', 'date__gte'), ('to', 'date__lte')):
+            if value := self.request.query_params.get(query_param):
+                try:
+                    date = parse_date(value)
+                except ValueError:
+                    date = None
+                if date is None:
+                    raise ValidationError({query_param: 'Enter a valid date (YYYY-MM-DD).'})
+                queryset = queryset.filter(**{lookup: date})
+        return queryset
@@ -3,6 +3,7 @@ export default Vue.component('video-preview', {
   template: `
     <video autoplay controls
       :alt="entry.title"
+      :poster="entry.extra_attributes.previews.preview_poster"
       :src="entry.extra_attributes.previews.preview"/>
   `
 });
\ No newline at end of file
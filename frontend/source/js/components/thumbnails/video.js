@@ -13,11 +13,13 @@ export default Vue.component('video-thumbnail', {
     <video
       :alt="entry.title"
       :height="height"
+      :poster="entry.extra_attributes.previews.thumbnail_poster"
       :src="entry.extra_attributes.previews.thumbnail"
       @click="$emit('select', entry)"
       @mouseleave="videoHoverEnd"
       @mouseover="videoHoverStart"
       loop
+      preload="none"
       ref="videoElement"/>
   `
 });
\ No newline at end of file